@@ -1,10 +1,23 @@
+import time
+_STARTUP_STARTED = time.perf_counter()  # --startup-profile 用于统计导入耗时
+
 import sys
 import os
-import cv2
+import collections
+import shutil
+import multiprocessing
+import sqlite3
+import threading
 from PyQt5 import QtWidgets, QtGui, QtCore
 from PyQt5.QtCore import QThread, pyqtSignal
 from PyQt5.QtCore import QThread, pyqtSignal
 import configparser
+from fx_engine import (
+    DEFAULT_ENCODER_OPTIONS, DEFAULT_FILTER_OPTIONS, DEFAULT_SAMPLING_OPTIONS, DEFAULT_TRANSFORM_OPTIONS, FRAME_INDEX_SUFFIX, IMAGE_FORMATS, INTERPOLATIONS, SPARSE_MODE_AUTO,
+    ExtractionEngine, check_gpu_availability, make_options, parse_crop, read_frame_index, warm_up
+)
+
+_IMPORTS_FINISHED = time.perf_counter()
 
 STYLE_SHEET = '''
 QWidget {
@@ -123,114 +136,353 @@ QGroupBox::title {
 }
 '''
 
-def check_gpu_availability():
-    """检查GPU是否可用"""
-    try:
-        cuda_devices = cv2.cuda.getCudaEnabledDeviceCount()
-        return cuda_devices > 0
-    except:
-        return False
+# 提取线程向界面发送新帧和进度的最短间隔（秒）
+SIGNAL_BATCH_INTERVAL = 0.1
+
 
 class VideoFrameExtractorThread(QThread):
-    progress = pyqtSignal(int)
+    """提取线程，在后台驱动 ExtractionEngine 并把回报转成 Qt 信号
+
+    新帧路径、缩略图和进度不逐帧发信号，而是先缓存，每 SIGNAL_BATCH_INTERVAL
+    秒合并发送一次，避免短间隔、多文件时 Qt 事件队列堆积导致界面滞后。
+    """
+    progress = pyqtSignal(dict)  # ProgressTracker.snapshot()
     finished = pyqtSignal()
     error = pyqtSignal(str)
-    new_frame_extracted = pyqtSignal(str)
+    new_frames_extracted = pyqtSignal(list)  # [图片路径]
+    thumbnails_ready = pyqtSignal(list)  # [(图片路径, QImage)]
 
-    def __init__(self, video_paths, output_folder, interval, use_gpu, separate_folders):
+    def __init__(self, video_paths, output_folder, interval, use_gpu, separate_folders,
+                 sparse_mode=SPARSE_MODE_AUTO, workers=1, encoder_options=None, transform_options=None,
+                 thumbnail_size=0, sampling_options=None, filter_options=None, resume=True):
         super().__init__()
         self.video_paths = video_paths
-        self.output_folder = output_folder
-        self.interval = interval
-        self.use_gpu = use_gpu and check_gpu_availability()
-        self.is_paused = False
-        self.separate_folders = separate_folders
-        self.should_stop = False  # 添加停止标志
-
-    def process_frame_gpu(self, frame):
-        """使用GPU处理帧"""
+        self.options = make_options(
+            **(encoder_options or {}),
+            **(transform_options or {}),
+            **(sampling_options or {}),
+            **(filter_options or {}),
+            output_folder=output_folder,
+            interval=interval,
+            use_gpu=use_gpu,
+            separate_folders=separate_folders,
+            sparse_mode=sparse_mode,
+            thumbnail_size=thumbnail_size,
+            resume=resume,
+        )
+        # 暂停、继续和停止通过引擎的事件通知解码循环（包括进程池中的子进程），不需要轮询
+        self.engine = ExtractionEngine(workers)
+
+        # report() 在本线程调用，flush_reports 在定时线程调用，缓存用锁保护
+        self.batch_lock = threading.Lock()
+        self.pending_frames = []
+        self.pending_thumbnails = []
+        self.pending_progress = None
+
+    def report(self, kind, payload):
+        """缓存提取引擎的回报，由 flush_reports 定时合并为 Qt 信号"""
+        if kind == 'thumbnail':
+            # 在工作线程里把 BGR 数组转换成 QImage，界面线程只需转成 QPixmap
+            image_path, thumbnail = payload
+            height, width = thumbnail.shape[:2]
+            image = QtGui.QImage(thumbnail.data, width, height, thumbnail.strides[0],
+                                 QtGui.QImage.Format_RGB888).rgbSwapped()
+            with self.batch_lock:
+                self.pending_thumbnails.append((image_path, image))
+        elif kind == 'frame':
+            with self.batch_lock:
+                self.pending_frames.append(payload)
+        elif kind == 'progress':
+            with self.batch_lock:
+                self.pending_progress = payload  # 只保留最新值
+        elif kind == 'error':
+            self.error.emit(payload)
+
+    def flush_reports(self):
+        with self.batch_lock:
+            frames, self.pending_frames = self.pending_frames, []
+            thumbnails, self.pending_thumbnails = self.pending_thumbnails, []
+            progress, self.pending_progress = self.pending_progress, None
+        # 先发缩略图，画廊插入新行时缩略图已经就绪
+        if thumbnails:
+            self.thumbnails_ready.emit(thumbnails)
+        if frames:
+            self.new_frames_extracted.emit(frames)
+        if progress is not None:
+            self.progress.emit(progress)
+
+    def flush_reports_periodically(self, done):
+        while not done.wait(SIGNAL_BATCH_INTERVAL):
+            self.flush_reports()
+
+    def run(self):
+        # GPU 探测结果已缓存，放在工作线程里确认，不阻塞界面
+        self.options['use_gpu'] = self.options['use_gpu'] and check_gpu_availability()
+        done = threading.Event()
+        flusher = threading.Thread(target=self.flush_reports_periodically, args=(done,), daemon=True)
+        flusher.start()
         try:
-            # 将CPU图像数据传输到GPU
-            gpu_frame = cv2.cuda_GpuMat()
-            gpu_frame.upload(frame)
+            self.engine.submit(self.video_paths, self.options)
+            for kind, payload in self.engine.results():
+                self.report(kind, payload)
+        finally:
+            done.set()
+            flusher.join()
+            self.flush_reports()
+        self.finished.emit()
 
-            # 示例：使用高斯模糊处理
-            gpu_blurred = cv2.cuda.GaussianBlur(gpu_frame, (5, 5), 0)
+    def pause(self):
+        self.engine.pause()
 
-            # 将处理后的图像从GPU传回CPU
-            result = gpu_blurred.download()
-            return result
-        except cv2.error as e:
-            self.error.emit(f"GPU处理出错: {str(e)}")
-            return frame  # 出错时返回原始帧
+    def resume(self):
+        self.engine.resume()
+
+    def is_paused(self):
+        return self.engine.is_paused()
+
+    def stop(self):
+        self.engine.cancel()  # 设置停止标志，暂停中的解码循环也会被唤醒
+
+class BackendWarmupThread(QThread):
+    """窗口显示后在后台导入 OpenCV 并探测 GPU"""
+    ready = pyqtSignal(bool)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.has_gpu = False
+        self.timings = []
 
     def run(self):
-        for video_path in self.video_paths:
-            if self.should_stop:  # 检查停止标志
-                break
-            try:
-                video_name = os.path.splitext(os.path.basename(video_path))[0]
-                cap = cv2.VideoCapture(video_path)
-                if not cap.isOpened():
-                    self.error.emit(f"Could not open video: {video_path}")
-                    continue
+        self.has_gpu, self.timings = warm_up()
+        self.ready.emit(self.has_gpu)
 
-                total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-                fps = cap.get(cv2.CAP_PROP_FPS)
-                if fps <= 0:
-                    self.error.emit(f"Invalid FPS for video: {video_path}")
-                    continue
 
-                interval_frames = int(fps * self.interval)
-                frame_count = 0
-                extracted_count = 0
+# 原图按此边长（像素）切块，放大查看时只绘制可见的分块
+PREVIEW_TILE_SIZE = 512
+PREVIEW_MAX_ZOOM = 8.0
+PREVIEW_ZOOM_STEP = 1.25
+# 审阅时沿翻页方向预读的张数，以及预读缓存的内存上限
+PREVIEW_PREFETCH = 4
+PREVIEW_CACHE_BYTES = 512 * 1024 * 1024
 
-                if self.separate_folders:
-                    video_output_folder = os.path.join(self.output_folder, video_name)
-                    if not os.path.exists(video_output_folder):
-                        os.makedirs(video_output_folder)
-                else:
-                    video_output_folder = self.output_folder
 
-                while True:
-                    if self.should_stop:  # 检查停止标志
-                        break
+class PreviewSignals(QtCore.QObject):
+    # 图片路径, 是否原图, 缩放到窗口大小的预览图, {(列, 行): 原始分辨率的分块}
+    loaded = pyqtSignal(str, bool, QtGui.QImage, dict)
 
-                    if self.is_paused:
-                        self.msleep(100)
-                        continue
+    def __init__(self):
+        super().__init__()
+        self.wanted = frozenset()  # 仍然需要的图片，换图或关闭后排队的任务直接跳过
 
-                    ret, frame = cap.read()
-                    if not ret:
-                        break
 
-                    if frame_count % interval_frames == 0:
-                        if self.use_gpu:
-                            frame = self.process_frame_gpu(frame)  # 使用GPU处理帧
+class PreviewLoader(QtCore.QRunnable):
+    """在线程池中解码预览图
 
-                        output_path = os.path.join(
-                            video_output_folder,
-                            f"{video_name}_frame_{extracted_count:04d}.jpg"
-                        )
-                        cv2.imwrite(output_path, frame)
-                        self.new_frame_extracted.emit(output_path)
-                        self.progress.emit(frame_count)
-                        extracted_count += 1
+    只要预览图时用 QImageReader.setScaledSize 直接解码到 bounds 以内（JPEG 可在解码时缩小）；
+    full 为真时解码原图，切成 PREVIEW_TILE_SIZE 的分块，并缩小出一张预览图。
+    """
 
-                    frame_count += 1
+    def __init__(self, image_path, signals, bounds, full=False):
+        super().__init__()
+        self.image_path = image_path
+        self.signals = signals
+        self.bounds = bounds
+        self.full = full
 
-                cap.release()
+    def run(self):
+        if self.image_path not in self.signals.wanted:
+            return
+        reader = QtGui.QImageReader(self.image_path)
+        if not self.full:
+            size = reader.size()
+            if size.isValid() and (size.width() > self.bounds.width() or size.height() > self.bounds.height()):
+                reader.setScaledSize(size.scaled(self.bounds, QtCore.Qt.KeepAspectRatio))
+            self.signals.loaded.emit(self.image_path, False, reader.read(), {})
+            return
+        image = reader.read()
+        tiles = {}
+        for y in range(0, image.height(), PREVIEW_TILE_SIZE):
+            for x in range(0, image.width(), PREVIEW_TILE_SIZE):
+                tiles[(x // PREVIEW_TILE_SIZE, y // PREVIEW_TILE_SIZE)] = image.copy(
+                    x, y, min(PREVIEW_TILE_SIZE, image.width() - x), min(PREVIEW_TILE_SIZE, image.height() - y)
+                )
+        preview = image
+        if image.width() > self.bounds.width() or image.height() > self.bounds.height():
+            preview = image.scaled(self.bounds, QtCore.Qt.KeepAspectRatio, QtCore.Qt.SmoothTransformation)
+        self.signals.loaded.emit(self.image_path, True, preview, tiles)
+
+
+class PreviewCanvas(QtWidgets.QWidget):
+    """预览画布：适应窗口或按比例缩放显示，放大后可拖动平移
+
+    依次可用的来源有缩略图、按窗口大小解码的预览图和原图分块，每次绘制都从
+    当前最清晰的来源直接缩放，不会反复缩放已经缩小过的图。
+    """
+    view_changed = pyqtSignal()
+    clicked = pyqtSignal()
 
-            except Exception as e:
-                self.error.emit(f"Error processing video {video_path}: {str(e)}")
-                continue
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setFocusPolicy(QtCore.Qt.StrongFocus)
+        self.setSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Expanding)
+        self.image_size = QtCore.QSize()
+        self.thumbnail = None  # QPixmap
+        self.preview = None  # QImage
+        self.tiles = None  # {(列, 行): QImage}
+        self.zoom = None  # None 表示适应窗口
+        self.center = QtCore.QPointF()  # 画布中心对应的图像坐标
+        self.drag_origin = None
+        self.dragged = False
+
+    def set_image(self, image_size, thumbnail=None):
+        self.image_size = image_size
+        self.thumbnail = thumbnail
+        self.preview = None
+        self.tiles = None
+        self.zoom = None
+        self.center = QtCore.QPointF(image_size.width() / 2, image_size.height() / 2)
+        self.update()
+        self.view_changed.emit()
+
+    def fit_scale(self):
+        if self.image_size.isEmpty():
+            return 1.0
+        return min(self.width() / self.image_size.width(), self.height() / self.image_size.height())
+
+    def scale(self):
+        return self.fit_scale() if self.zoom is None else self.zoom
+
+    def needed_width(self):
+        """当前缩放下需要的图像宽度（设备像素）"""
+        return self.image_size.width() * self.scale() * self.devicePixelRatioF()
+
+    def image_rect(self):
+        """整张图在画布上的位置"""
+        scale = self.scale()
+        return QtCore.QRectF(self.width() / 2 - self.center.x() * scale, self.height() / 2 - self.center.y() * scale,
+                             self.image_size.width() * scale, self.image_size.height() * scale)
+
+    def clamp_center(self):
+        """图比画布小时居中，否则不让图的边缘离开画布"""
+        scale = self.scale()
+        x, y = self.center.x(), self.center.y()
+        half_width, half_height = self.width() / 2 / scale, self.height() / 2 / scale
+        width, height = self.image_size.width(), self.image_size.height()
+        x = width / 2 if width <= 2 * half_width else min(max(x, half_width), width - half_width)
+        y = height / 2 if height <= 2 * half_height else min(max(y, half_height), height - half_height)
+        self.center = QtCore.QPointF(x, y)
+
+    def set_zoom(self, zoom, anchor=None):
+        """缩放到 zoom，保持 anchor（画布坐标）下的图像位置不动；不小于适应窗口的比例"""
+        if self.image_size.isEmpty():
+            return
+        anchor = anchor if anchor is not None else QtCore.QPointF(self.width() / 2, self.height() / 2)
+        old_scale = self.scale()
+        rect = self.image_rect()
+        point = QtCore.QPointF((anchor.x() - rect.left()) / old_scale, (anchor.y() - rect.top()) / old_scale)
+        zoom = min(zoom, PREVIEW_MAX_ZOOM)
+        if zoom <= self.fit_scale():
+            self.zoom = None
+        else:
+            self.zoom = zoom
+            self.center = QtCore.QPointF(point.x() - (anchor.x() - self.width() / 2) / zoom,
+                                         point.y() - (anchor.y() - self.height() / 2) / zoom)
+        self.clamp_center()
+        self.update()
+        self.view_changed.emit()
+
+    def paintEvent(self, event):
+        if self.image_size.isEmpty():
+            return
+        painter = QtGui.QPainter(self)
+        scale = self.scale()
+        # 放大到 2 倍以上时不插值，便于看清像素
+        painter.setRenderHint(QtGui.QPainter.SmoothPixmapTransform, scale < 2)
+        target = self.image_rect()
+        if self.tiles and (self.preview is None or self.needed_width() > self.preview.width()):
+            self.paint_tiles(painter, target, scale, QtCore.QRectF(event.rect()))
+        elif self.preview is not None:
+            painter.drawImage(target, self.preview)
+        elif self.thumbnail is not None:
+            painter.drawPixmap(target, self.thumbnail, QtCore.QRectF(self.thumbnail.rect()))
+
+    def paint_tiles(self, painter, target, scale, visible):
+        step = PREVIEW_TILE_SIZE * scale
+        first_column = max(0, int((visible.left() - target.left()) // step))
+        last_column = int((visible.right() - target.left()) // step)
+        first_row = max(0, int((visible.top() - target.top()) // step))
+        last_row = int((visible.bottom() - target.top()) // step)
+        for row in range(first_row, last_row + 1):
+            for column in range(first_column, last_column + 1):
+                tile = self.tiles.get((column, row))
+                if tile is None:
+                    continue
+                # 边缘取整到同一组坐标，相邻分块之间不留缝
+                left = round(target.left() + column * step)
+                top = round(target.top() + row * step)
+                right = round(target.left() + (column * PREVIEW_TILE_SIZE + tile.width()) * scale)
+                bottom = round(target.top() + (row * PREVIEW_TILE_SIZE + tile.height()) * scale)
+                painter.drawImage(QtCore.QRect(left, top, right - left, bottom - top), tile)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self.zoom is not None and self.zoom <= self.fit_scale():
+            self.zoom = None
+        self.clamp_center()
+        self.view_changed.emit()
+
+    def wheelEvent(self, event):
+        steps = event.angleDelta().y() / 120
+        if steps:
+            self.set_zoom(self.scale() * PREVIEW_ZOOM_STEP ** steps, QtCore.QPointF(event.pos()))
+
+    def keyPressEvent(self, event):
+        key = event.key()
+        if key in (QtCore.Qt.Key_Plus, QtCore.Qt.Key_Equal):
+            self.set_zoom(self.scale() * PREVIEW_ZOOM_STEP)
+        elif key == QtCore.Qt.Key_Minus:
+            self.set_zoom(self.scale() / PREVIEW_ZOOM_STEP)
+        elif key == QtCore.Qt.Key_0:
+            self.set_zoom(0)
+        elif key == QtCore.Qt.Key_1:
+            self.set_zoom(1.0 / self.devicePixelRatioF())  # 一个图像像素对应一个屏幕像素
+        else:
+            super().keyPressEvent(event)
+
+    def mousePressEvent(self, event):
+        if event.button() == QtCore.Qt.LeftButton:
+            self.drag_origin = (event.pos(), self.center)
+            self.dragged = False
+
+    def mouseMoveEvent(self, event):
+        if self.drag_origin is None or self.zoom is None:
+            return
+        origin, center = self.drag_origin
+        delta = event.pos() - origin
+        if delta.manhattanLength() > QtWidgets.QApplication.startDragDistance():
+            self.dragged = True
+        self.center = QtCore.QPointF(center.x() - delta.x() / self.zoom, center.y() - delta.y() / self.zoom)
+        self.clamp_center()
+        self.update()
+
+    def mouseReleaseEvent(self, event):
+        if self.drag_origin is not None and not self.dragged and self.zoom is None:
+            self.clicked.emit()
+        self.drag_origin = None
 
-        self.finished.emit()
-    def stop(self):
-        self.should_stop = True  # 设置停止标志
 
 class ImagePreviewDialog(QtWidgets.QDialog):
-    def __init__(self, image_path, parent=None):
+    """大图预览与逐帧审阅
+
+    先显示画廊中已缓存的缩略图，再在后台按窗口大小解码预览图，窗口变大时重新解码；
+    同时在后台解码原图，放大超过预览图的分辨率时分块绘制。
+    传入画廊时为审阅模式：←/→（空格、PageUp/PageDown）切换上一张/下一张，Home/End 跳到首尾，
+    Delete 删除当前帧（与删除按钮相同，可以撤销）。沿翻页方向预读 PREVIEW_PREFETCH 张原图，
+    放进有内存上限的缓存，切换时不必等待解码。
+    滚轮缩放，拖动平移，0 适应窗口，1 原始大小；适应窗口时单击关闭。
+    """
+
+    def __init__(self, image_path, parent=None, thumbnail=None, gallery=None):
         super().__init__(parent)
         self.setWindowTitle('Image Preview')
         self.setModal(True)
@@ -242,86 +494,847 @@ class ImagePreviewDialog(QtWidgets.QDialog):
 
         layout = QtWidgets.QVBoxLayout(self)
 
-        self.image_label = QtWidgets.QLabel()
-        self.image_label.setAlignment(QtCore.Qt.AlignCenter)
-        self.image_label.setScaledContents(True)
-        layout.addWidget(self.image_label)
+        self.canvas = PreviewCanvas()
+        self.canvas.view_changed.connect(self.on_view_changed)
+        self.canvas.clicked.connect(self.close)
+        layout.addWidget(self.canvas)
 
+        bottom_layout = QtWidgets.QHBoxLayout()
+        self.info_label = QtWidgets.QLabel('')
+        bottom_layout.addWidget(self.info_label, 1)
         close_button = QtWidgets.QPushButton('Close Preview')
+        close_button.setFocusPolicy(QtCore.Qt.NoFocus)  # 空格用于翻页
         close_button.clicked.connect(self.close)
-        layout.addWidget(close_button)
-
-        self.load_image(image_path)
+        bottom_layout.addWidget(close_button)
+        layout.addLayout(bottom_layout)
+
+        self.gallery = gallery
+        self.cache = PreviewCache()
+        self.loading = set()  # 已交给线程池的 (路径, 是否原图)
+        self.step = 1  # 最近的翻页方向，预读沿这个方向
+        self.signals = PreviewSignals()
+        self.signals.loaded.connect(self.on_loaded)
+        self.image_path = None
+        self.requested_bounds = QtCore.QSize()
+
+        # 连续调整窗口大小时只在停下后解码一次
+        self.decode_timer = QtCore.QTimer(self)
+        self.decode_timer.setSingleShot(True)
+        self.decode_timer.setInterval(150)
+        self.decode_timer.timeout.connect(self.request_preview)
+
+        layout.activate()  # 显示前先确定画布大小，第一次解码就按这个尺寸
+        self.show_image(image_path, thumbnail)
+        self.canvas.setFocus()
+
+    def bounds(self):
+        """适应窗口时需要的预览图尺寸（设备像素）"""
+        ratio = self.canvas.devicePixelRatioF()
+        return QtCore.QSize(int(self.canvas.width() * ratio) + 1, int(self.canvas.height() * ratio) + 1)
+
+    def show_image(self, image_path, thumbnail=None):
+        self.image_path = image_path
+        self.setWindowTitle(f'Image Preview - {os.path.basename(image_path)}')
+        self.canvas.set_image(QtGui.QImageReader(image_path).size(), thumbnail)  # 只读文件头
+        entry = self.cache.get(image_path)
+        if entry is not None:
+            self.canvas.preview, self.canvas.tiles = entry
+            self.canvas.update()
+        self.requested_bounds = QtCore.QSize()
+        self.request_preview()  # 先提交，没有预读过的图片先用快速解码的预览图
+        self.prefetch()
+
+    def wanted_paths(self):
+        """当前图片，以及沿翻页方向预读的图片和上一张；按原图大小估计，总量不超过缓存上限"""
+        paths = [self.image_path]
+        model = self.gallery.model() if self.gallery is not None else None
+        row = model.rows.get(self.image_path) if model is not None else None
+        if row is None:
+            return paths
+        budget = self.cache.max_bytes - self.canvas.image_size.width() * self.canvas.image_size.height() * 4
+        for offset in list(range(1, PREVIEW_PREFETCH + 1)) + [-1]:
+            neighbour = row + offset * self.step
+            if not 0 <= neighbour < len(model.paths):
+                continue
+            image_path = model.paths[neighbour]
+            size = QtGui.QImageReader(image_path).size()
+            budget -= max(size.width(), 0) * max(size.height(), 0) * 4
+            if budget < 0:
+                break
+            paths.append(image_path)
+        return paths
+
+    def prefetch(self):
+        """在后台解码当前和预读范围内的原图，越靠前的优先"""
+        paths = self.wanted_paths()
+        self.signals.wanted = frozenset(paths)
+        for order, image_path in enumerate(paths):
+            if image_path not in self.cache.entries and (image_path, True) not in self.loading:
+                self.start_loader(image_path, True, len(paths) - order)
+
+    def start_loader(self, image_path, full, priority):
+        self.loading.add((image_path, full))
+        QtCore.QThreadPool.globalInstance().start(
+            PreviewLoader(image_path, self.signals, self.bounds(), full), priority
+        )
 
-    def load_image(self, image_path):
-        pixmap = QtGui.QPixmap(image_path)
+    def request_preview(self):
+        """按适应窗口所需的尺寸在后台快速解码当前图片；已有的预览图足够清晰时不重复解码"""
+        bounds = self.bounds()
+        if bounds.width() <= self.requested_bounds.width() and bounds.height() <= self.requested_bounds.height():
+            return  # 已经请求过
+        preview = self.canvas.preview
+        if preview is None:
+            if (self.image_path, True) in self.loading:
+                return  # 预读的原图已经在解码，再单独解码一次只会拖慢后面的预读
+        else:
+            image_size = self.canvas.image_size
+            if image_size.width() > bounds.width() or image_size.height() > bounds.height():
+                image_size = image_size.scaled(bounds, QtCore.Qt.KeepAspectRatio)
+            if preview.width() >= image_size.width() - 1:
+                return  # 现有的预览图已经足够清晰
+        self.requested_bounds = bounds
+        self.start_loader(self.image_path, False, PREVIEW_PREFETCH + 2)  # 比预读的原图优先
+
+    def on_view_changed(self):
+        size = self.canvas.image_size
+        text = f"{size.width()}×{size.height()}  {self.canvas.scale() * 100:.0f}%" if not size.isEmpty() \
+            else '无法读取 (Unreadable)'
+        model = self.gallery.model() if self.gallery is not None else None
+        row = model.rows.get(self.image_path) if model is not None else None
+        if row is not None:
+            text = f"{row + 1}/{len(model.paths)}  {os.path.basename(self.image_path)}  {text}"
+        self.info_label.setText(text)
+        if self.canvas.zoom is None:
+            self.decode_timer.start()
+
+    def on_loaded(self, image_path, full, preview, tiles):
+        self.loading.discard((image_path, full))
+        if preview.isNull():
+            return
+        if full and image_path in self.signals.wanted:
+            self.cache.put(image_path, (preview, tiles))
+        if image_path != self.image_path:
+            return
+        if self.canvas.preview is None or preview.width() > self.canvas.preview.width():
+            self.canvas.preview = preview
+        if tiles:
+            self.canvas.tiles = tiles
+        self.canvas.update()
+
+    def show_row(self, row):
+        model = self.gallery.model()
+        image_path = model.paths[row]
+        self.show_image(image_path, model.thumbnails.get(image_path))
+        # 画廊跟着滚动，关闭审阅后停在看到的位置
+        index = model.index(row)
+        self.gallery.selectionModel().setCurrentIndex(index, QtCore.QItemSelectionModel.NoUpdate)
+        self.gallery.scrollTo(index)
+
+    def step_image(self, step):
+        model = self.gallery.model()
+        row = model.rows.get(self.image_path)
+        if row is None or not model.paths:
+            return
+        self.step = 1 if step > 0 else -1
+        target = min(max(row + step, 0), len(model.paths) - 1)
+        if target != row:
+            self.show_row(target)
+
+    def delete_current(self):
+        model = self.gallery.model()
+        row = model.rows.get(self.image_path)
+        if row is None:
+            return
+        self.cache.discard(self.image_path)
+        self.gallery.delete_requested.emit([row])
+        if not model.paths:
+            self.close()
+            return
+        # 删除后沿翻页方向继续
+        self.show_row(row - 1 if self.step < 0 and row > 0 else min(row, len(model.paths) - 1))
 
-        # Convert the width and height to integers
-        scaled_pixmap = pixmap.scaled(
-            int(self.size().width() * 0.95),  # Convert to int
-            int(self.size().height() * 0.95),  # Convert to int
-            QtCore.Qt.KeepAspectRatio,
-            QtCore.Qt.SmoothTransformation
-        )
-        self.image_label.setPixmap(scaled_pixmap)
-        self.image_label.setMaximumSize(self.size())
+    def keyPressEvent(self, event):
+        if self.gallery is None:
+            super().keyPressEvent(event)
+            return
+        key = event.key()
+        if key in (QtCore.Qt.Key_Right, QtCore.Qt.Key_Down, QtCore.Qt.Key_Space, QtCore.Qt.Key_PageDown):
+            self.step_image(1)
+        elif key in (QtCore.Qt.Key_Left, QtCore.Qt.Key_Up, QtCore.Qt.Key_Backspace, QtCore.Qt.Key_PageUp):
+            self.step_image(-1)
+        elif key == QtCore.Qt.Key_Home:
+            self.step_image(-len(self.gallery.model().paths))
+        elif key == QtCore.Qt.Key_End:
+            self.step_image(len(self.gallery.model().paths))
+        elif key == QtCore.Qt.Key_Delete:
+            self.delete_current()
+        else:
+            super().keyPressEvent(event)
+
+    def done(self, result):
+        self.signals.wanted = frozenset()  # 还没开始的解码不再需要
+        try:
+            self.signals.loaded.disconnect(self.on_loaded)  # 正在解码的结果也不再接收
+        except TypeError:
+            pass  # done 可能被调用两次，第二次时已断开
+        self.cache.clear()
+        # 原图分块可达数百 MB，对话框销毁前就释放
+        self.canvas.thumbnail = self.canvas.preview = self.canvas.tiles = None
+        super().done(result)
+
+
+
+THUMBNAIL_SIZE = 360
+PREVIEW_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+GALLERY_ITEM_SIZE = QtCore.QSize(360, 220)
+# 画廊一次增删的区间超过此数时改为重置模型
+MAX_ROW_RANGES = 64
+# 删除的帧先移到所在文件夹下的暂存目录，可以撤销；超出撤销步数的批次在后台清理
+STAGING_DIR = '.fx_deleted'
+UNDO_LIMIT = 20
+# 画廊的排序方式，除文件名外都依据提取时写出的帧索引，没有索引的图片排在最后
+GALLERY_SORT_KEYS = [
+    ('name', '文件名 (Name)'),
+    ('time', '视频时间 (Video Time)'),
+    ('sharpness', '清晰度 (Sharpness)'),
+    ('size', '文件大小 (File Size)'),
+]
+
+
+def create_thumbnail(image_path):
+    """读取图片并缩放为缩略图，失败时返回 None
+
+    通过 QImageReader.setScaledSize 让解码器直接输出小图（JPEG 可在解码时缩小），
+    比先解码整张图再缩放快得多。可在非界面线程调用。
+    """
+    try:
+        reader = QtGui.QImageReader(image_path)
+        size = reader.size()
+        if size.isValid() and (size.width() > THUMBNAIL_SIZE or size.height() > THUMBNAIL_SIZE):
+            # 设定缩略图的大小
+            reader.setScaledSize(size.scaled(THUMBNAIL_SIZE, THUMBNAIL_SIZE, QtCore.Qt.KeepAspectRatio))
+        image = reader.read()
+        if image.isNull():
+            return None
+        return image
+    except Exception as e:
+        print(f"Error creating thumbnail: {str(e)}")
+        return None
+
+
+def encode_thumbnail(image):
+    """把缩略图编码为 JPEG 字节，用于持久化缓存"""
+    buffer = QtCore.QBuffer()
+    buffer.open(QtCore.QIODevice.WriteOnly)
+    image.save(buffer, 'JPG', 85)
+    return bytes(buffer.data())
+
+
+class ThumbnailStore:
+    """持久化的缩略图缓存
+
+    输出目录下的单个 SQLite 文件，按 相对路径 + 修改时间 + 文件大小 识别图片，
+    文件被覆盖后旧缩略图自动失效。总大小超过 max_bytes 时淘汰最久未使用的条目。
+    连接在线程池的多个线程间共享，用锁串行化访问。
+    """
+    FILE_NAME = '.fx_thumbnails.sqlite'
+
+    def __init__(self, folder, max_bytes=512 * 1024 * 1024):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(os.path.join(folder, self.FILE_NAME), check_same_thread=False)
+        with self.lock:
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('PRAGMA synchronous=NORMAL')
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS thumbnails ('
+                'path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, '
+                'data BLOB, bytes INTEGER, last_used REAL)'
+            )
+            self.connection.execute('CREATE INDEX IF NOT EXISTS thumbnails_last_used ON thumbnails (last_used)')
+            self.connection.commit()
+            self.total_bytes = self.connection.execute('SELECT COALESCE(SUM(bytes), 0) FROM thumbnails').fetchone()[0]
+
+    def key(self, image_path):
+        return os.path.relpath(image_path, self.folder)
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+    def get(self, image_path, stat):
+        key = self.key(image_path)
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT data FROM thumbnails WHERE path = ? AND mtime_ns = ? AND size = ?',
+                (key, stat.st_mtime_ns, stat.st_size)
+            ).fetchone()
+            if row is None:
+                return None
+            self.connection.execute('UPDATE thumbnails SET last_used = ? WHERE path = ?', (time.time(), key))
+            self.connection.commit()
+            return row[0]
 
-    def resizeEvent(self, event):
-        super().resizeEvent(event)
-        if self.image_label.pixmap():
-            # Convert the width and height to integers
-            scaled_pixmap = self.image_label.pixmap().scaled(
-                int(self.size().width() * 0.95),  # Convert to int
-                int(self.size().height() * 0.95),  # Convert to int
-                QtCore.Qt.KeepAspectRatio,
-                QtCore.Qt.SmoothTransformation
+    def put_many(self, entries):
+        """entries 为 [(图片路径, os.stat 结果, JPEG 字节)]，在一个事务中写入"""
+        if not entries:
+            return
+        now = time.time()
+        with self.lock:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO thumbnails VALUES (?, ?, ?, ?, ?, ?)',
+                [(self.key(image_path), stat.st_mtime_ns, stat.st_size, data, len(data), now)
+                 for image_path, stat, data in entries]
             )
-            self.image_label.setPixmap(scaled_pixmap)
+            self.total_bytes = self.connection.execute('SELECT COALESCE(SUM(bytes), 0) FROM thumbnails').fetchone()[0]
+            if self.total_bytes > self.max_bytes:
+                self.evict()
+            self.connection.commit()
+
+    def evict(self):
+        # 一次清理到上限的 90%，避免每次写入都触发淘汰
+        target = self.max_bytes * 0.9
+        evicted = []
+        for path, size in self.connection.execute('SELECT path, bytes FROM thumbnails ORDER BY last_used'):
+            if self.total_bytes <= target:
+                break
+            evicted.append((path,))
+            self.total_bytes -= size
+        self.connection.executemany('DELETE FROM thumbnails WHERE path = ?', evicted)
 
-    def mousePressEvent(self, event):
-        # Close the dialog when clicking anywhere on it
-        self.close()
 
+def open_thumbnail_store(folder):
+    """打开目录下的缩略图缓存，目录不可写等情况返回 None（不使用持久化缓存）"""
+    try:
+        return ThumbnailStore(folder)
+    except (sqlite3.Error, OSError) as e:
+        print(f"Thumbnail cache disabled for {folder}: {str(e)}")
+        return None
+
+
+class ThumbnailSignals(QtCore.QObject):
+    loaded = pyqtSignal(str, QtGui.QImage)
+
+
+class ThumbnailLoader(QtCore.QRunnable):
+    """在线程池中生成缩略图：优先读持久化缓存，未命中时解码图片并写回缓存"""
+
+    def __init__(self, image_path, signals, store=None):
+        super().__init__()
+        self.image_path = image_path
+        self.signals = signals
+        self.store = store
+
+    def run(self):
+        image = None
+        try:
+            stat = os.stat(self.image_path)
+            data = self.store.get(self.image_path, stat) if self.store else None
+            if data is not None:
+                image = QtGui.QImage.fromData(data)
+            else:
+                image = create_thumbnail(self.image_path)
+                if image is not None and self.store:
+                    self.store.put_many([(self.image_path, stat, encode_thumbnail(image))])
+        except (OSError, sqlite3.Error) as e:
+            print(f"Error loading thumbnail: {str(e)}")
+        self.signals.loaded.emit(self.image_path, image if image is not None else QtGui.QImage())
+
+
+class ThumbnailSaver(QtCore.QRunnable):
+    """把提取过程中直接生成的缩略图成批写入持久化缓存"""
+
+    def __init__(self, store, thumbnails):
+        super().__init__()
+        self.store = store
+        self.thumbnails = thumbnails
+
+    def run(self):
+        entries = []
+        for image_path, image in self.thumbnails:
+            try:
+                entries.append((image_path, os.stat(image_path), encode_thumbnail(image)))
+            except OSError:
+                continue  # 文件已被删除
+        try:
+            self.store.put_many(entries)
+        except sqlite3.Error as e:
+            print(f"Error saving thumbnails: {str(e)}")
+
+
+class MoveSignals(QtCore.QObject):
+    progress = pyqtSignal(int, int)  # 已处理, 总数
+    finished = pyqtSignal(list, list)  # [(源, 目标)] 已移动, [(源, 错误信息)] 失败
+
+
+class FileMover(QtCore.QRunnable):
+    """在后台按 (源, 目标) 重命名一批文件，用于删除到暂存目录和撤销删除
+
+    同一文件系统内重命名不复制数据，每个文件的开销是常数。源文件已经不存在时忽略，
+    目标已存在时不覆盖，记为失败。进度按 SIGNAL_BATCH_INTERVAL 合并回报。
+    """
+
+    def __init__(self, moves, signals):
+        super().__init__()
+        self.moves = moves
+        self.signals = signals
+
+    def run(self):
+        moved = []
+        failed = []
+        folders = set()
+        reported_at = time.perf_counter()
+        for done, (source, target) in enumerate(self.moves, 1):
+            try:
+                folder = os.path.dirname(target)
+                if folder not in folders:
+                    os.makedirs(folder, exist_ok=True)
+                    folders.add(folder)
+                if os.path.exists(target):
+                    raise FileExistsError(f"{target} already exists")
+                os.rename(source, target)
+                moved.append((source, target))
+            except FileNotFoundError:
+                pass  # 已经不在了
+            except OSError as e:
+                failed.append((source, str(e)))
+            now = time.perf_counter()
+            if now - reported_at >= SIGNAL_BATCH_INTERVAL:
+                reported_at = now
+                self.signals.progress.emit(done, len(self.moves))
+        self.signals.finished.emit(moved, failed)
+
+
+class StagingPurger(QtCore.QRunnable):
+    """在后台清空暂存的删除批次，真正释放磁盘空间；use_trash 时改为移到系统回收站"""
+
+    def __init__(self, folders, use_trash=False):
+        super().__init__()
+        self.folders = folders
+        self.use_trash = use_trash
 
+    def run(self):
+        for folder in self.folders:
+            if self.use_trash and os.path.isdir(folder):
+                for root, _, files in os.walk(folder):
+                    for name in files:
+                        QtCore.QFile.moveToTrash(os.path.join(root, name))
+            shutil.rmtree(folder, ignore_errors=True)
+            try:
+                os.rmdir(os.path.dirname(folder))  # 暂存目录空了就一起删掉
+            except OSError:
+                pass
+
+
+def read_frame_indexes(folder):
+    """读取文件夹（含子文件夹）中所有视频的帧索引，返回 {图片路径: 行}，行中的 'video' 为所属索引文件"""
+    metadata = {}
+    for root, dirs, files in os.walk(folder):
+        if STAGING_DIR in dirs:
+            dirs.remove(STAGING_DIR)
+        for name in files:
+            if name.endswith(FRAME_INDEX_SUFFIX):
+                index_path = os.path.join(root, name)
+                for row in read_frame_index(index_path):
+                    metadata[os.path.join(root, row['file'])] = dict(row, video=index_path)
+    return metadata
+
+
+def gallery_sort_key(key, metadata):
+    """返回按 GALLERY_SORT_KEYS 中的 key 排序图片路径的函数；清晰度和文件大小从大到小"""
+    def sort_key(image_path):
+        row = metadata.get(image_path)
+        if key == 'time':
+            value = None if row is None else (row['video'], row['pts_ms'])
+        elif key == 'sharpness':
+            value = None if row is None or row['sharpness'] is None else -row['sharpness']
+        elif key == 'size':
+            value = None if row is None or row['bytes'] is None else -row['bytes']
+        else:
+            value = ()
+        return value is None, value if value is not None else (), image_path
+    return sort_key
+
+
+def frame_tooltip(image_path, row):
+    lines = [image_path]
+    if row is not None:
+        lines.append(f"帧 (Frame): {row['frame_index']}  时间 (Time): {row['pts_ms'] / 1000:.3f}s")
+        details = []
+        if row['bytes'] is not None:
+            details.append(f"大小 (Size): {row['bytes'] / 1024:.1f} KB")
+        if row['sharpness'] is not None:
+            details.append(f"清晰度 (Sharpness): {row['sharpness']:.1f}")
+        if row['brightness'] is not None:
+            details.append(f"亮度 (Brightness): {row['brightness']:.1f}")
+        if details:
+            lines.append('  '.join(details))
+    return '\n'.join(lines)
+
+
+def row_ranges(rows):
+    """把行号合并成升序的连续区间 [(首行, 末行)]"""
+    ranges = []
+    for row in sorted(set(rows)):
+        if ranges and row == ranges[-1][1] + 1:
+            ranges[-1][1] = row
+        else:
+            ranges.append([row, row])
+    return ranges
+
+
+class ThumbnailCache:
+    """按最近使用淘汰的缩略图缓存，总像素内存不超过 max_bytes"""
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.entries = collections.OrderedDict()
+
+    @staticmethod
+    def entry_bytes(pixmap):
+        return pixmap.width() * pixmap.height() * pixmap.depth() // 8
+
+    def get(self, path):
+        entry = self.entries.get(path)
+        if entry is not None:
+            self.entries.move_to_end(path)
+        return entry
+
+    def put(self, path, entry):
+        self.discard(path)
+        self.entries[path] = entry
+        self.total_bytes += self.entry_bytes(entry)
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            _, evicted = self.entries.popitem(last=False)
+            self.total_bytes -= self.entry_bytes(evicted)
+
+    def discard(self, path):
+        entry = self.entries.pop(path, None)
+        if entry is not None:
+            self.total_bytes -= self.entry_bytes(entry)
+
+    def clear(self):
+        self.entries.clear()
+        self.total_bytes = 0
+
+
+class PreviewCache(ThumbnailCache):
+    """审阅时预读的大图缓存，条目为 (预览图, 原图分块)"""
+
+    def __init__(self, max_bytes=PREVIEW_CACHE_BYTES):
+        super().__init__(max_bytes)
+
+    @staticmethod
+    def entry_bytes(entry):
+        preview, tiles = entry
+        return preview.sizeInBytes() + sum(tile.sizeInBytes() for tile in tiles.values())
+
+
+class FrameGalleryModel(QtCore.QAbstractListModel):
+    """画廊的数据模型：只保存图片路径，缩略图进入 LRU 缓存
+
+    缩略图不在界面线程生成：提取时由提取线程直接从内存中的帧生成，
+    其余情况在视图需要显示时交给线程池从磁盘读取。结果先暂存，
+    由定时器成批放入缓存并通知视图刷新。
+    """
+    PathRole = QtCore.Qt.UserRole
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.paths = []
+        self.rows = {}  # 路径 -> 行号
+        self.metadata = {}  # 路径 -> 帧索引中的行，见 read_frame_indexes
+        self.thumbnails = ThumbnailCache()
+        self.pending_thumbnails = {}
+        self.unsaved_thumbnails = []  # 提取线程生成、还未写入持久化缓存的缩略图
+        self.store = None
+        self.requested = set()  # 已交给线程池、尚未返回的路径
+        self.unreadable = set()
+
+        self.loader_signals = ThumbnailSignals(self)
+        self.loader_signals.loaded.connect(self.queue_thumbnail)
+        self.loader_pool = QtCore.QThreadPool(self)
+        self.loader_pool.setMaxThreadCount(max(2, QtCore.QThread.idealThreadCount() // 2))
+
+        self.flush_timer = QtCore.QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(50)
+        self.flush_timer.timeout.connect(self.flush_thumbnails)
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.paths)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        image_path = self.paths[index.row()]
+        if role == QtCore.Qt.DisplayRole:
+            file_name = os.path.basename(image_path)
+            if len(file_name) > 20:
+                file_name = file_name[:17] + '...'
+            return file_name
+        if role == QtCore.Qt.DecorationRole:
+            return self.thumbnail(image_path)
+        if role == QtCore.Qt.ToolTipRole:
+            return frame_tooltip(image_path, self.metadata.get(image_path))
+        if role == self.PathRole:
+            return image_path
+        if role == QtCore.Qt.SizeHintRole:
+            return GALLERY_ITEM_SIZE
+        return None
+
+    def thumbnail(self, image_path):
+        pixmap = self.thumbnails.get(image_path)
+        if pixmap is None and image_path not in self.unreadable and image_path not in self.pending_thumbnails \
+                and image_path not in self.requested:
+            self.requested.add(image_path)
+            self.loader_pool.start(ThumbnailLoader(image_path, self.loader_signals, self.store))
+        return pixmap
+
+    def set_store(self, store):
+        """换用另一个持久化缓存（或 None）并关闭旧的连接
+
+        旧缓存排队中的读写直接取消，正在运行的等它们结束，之后才关闭连接。
+        """
+        if self.store is not None and self.store is not store:
+            self.loader_pool.clear()
+            self.loader_pool.waitForDone()
+            self.requested.clear()  # 被取消的加载不会再返回
+            self.store.close()
+        self.store = store
+
+    def set_metadata(self, metadata):
+        self.metadata = metadata
+
+    def sort_paths(self, key):
+        """按 GALLERY_SORT_KEYS 中的 key 重新排列所有行"""
+        paths = sorted(self.paths, key=gallery_sort_key(key, self.metadata))
+        if paths == self.paths:
+            return
+        self.beginResetModel()
+        self.paths = paths
+        self.rows = {path: index for index, path in enumerate(self.paths)}
+        self.endResetModel()
+
+    def queue_extracted_thumbnails(self, thumbnails):
+        """接收提取线程直接生成的一批缩略图，刷新时一并写入持久化缓存"""
+        if self.store is not None:
+            self.unsaved_thumbnails.extend(thumbnails)
+        self.pending_thumbnails.update(thumbnails)
+        if not self.flush_timer.isActive():
+            self.flush_timer.start()
+
+    def queue_thumbnail(self, image_path, image):
+        """接收线程池或提取线程生成的缩略图，稍后成批刷新"""
+        self.pending_thumbnails[image_path] = image
+        if not self.flush_timer.isActive():
+            self.flush_timer.start()
+
+    def flush_thumbnails(self):
+        changed_rows = []
+        for image_path, image in self.pending_thumbnails.items():
+            self.requested.discard(image_path)
+            if image.isNull():
+                self.unreadable.add(image_path)
+                continue
+            self.thumbnails.put(image_path, QtGui.QPixmap.fromImage(image))
+            row = self.rows.get(image_path)
+            if row is not None:
+                changed_rows.append(row)
+        self.pending_thumbnails.clear()
+        if self.unsaved_thumbnails:
+            self.loader_pool.start(ThumbnailSaver(self.store, self.unsaved_thumbnails))
+            self.unsaved_thumbnails = []
+        if changed_rows:
+            self.dataChanged.emit(self.index(min(changed_rows)), self.index(max(changed_rows)),
+                                  [QtCore.Qt.DecorationRole])
+
+    def add_paths(self, image_paths):
+        if not image_paths:
+            return
+        first = len(self.paths)
+        self.beginInsertRows(QtCore.QModelIndex(), first, first + len(image_paths) - 1)
+        self.paths.extend(image_paths)
+        self.rows.update((image_path, first + offset) for offset, image_path in enumerate(image_paths))
+        self.endInsertRows()
+
+    def remove_rows(self, rows):
+        """按连续区间一次删除多行，按行号顺序返回被删除的路径；行号索引只在最后重建一次"""
+        ranges = row_ranges(rows)
+        if len(ranges) > MAX_ROW_RANGES:
+            # 区间太碎时逐段通知视图反而更慢，整体重置一次
+            self.beginResetModel()
+            removed_rows = set(rows)
+            removed = [path for row, path in enumerate(self.paths) if row in removed_rows]
+            self.paths = [path for row, path in enumerate(self.paths) if row not in removed_rows]
+            self.endResetModel()
+        else:
+            chunks = []
+            for first, last in reversed(ranges):  # 从后往前删除，前面的行号不受影响
+                self.beginRemoveRows(QtCore.QModelIndex(), first, last)
+                chunks.append(self.paths[first:last + 1])
+                del self.paths[first:last + 1]
+                self.endRemoveRows()
+            removed = [path for chunk in reversed(chunks) for path in chunk]
+        for image_path in removed:
+            self.thumbnails.discard(image_path)
+        self.rows = {path: index for index, path in enumerate(self.paths)}
+        return removed
+
+    def insert_paths(self, entries):
+        """把 (行号, 路径) 按行号升序插回，行号是插入后的位置，用于撤销 remove_rows"""
+        ranges = []
+        for row, image_path in entries:
+            if ranges and row == ranges[-1][0] + len(ranges[-1][1]):
+                ranges[-1][1].append(image_path)
+            else:
+                ranges.append((row, [image_path]))
+        if len(ranges) > MAX_ROW_RANGES:
+            self.beginResetModel()
+            merged = []
+            position = 0
+            for row, chunk in ranges:
+                count = max(row - len(merged), 0)
+                merged.extend(self.paths[position:position + count])
+                position += count
+                merged.extend(chunk)
+            merged.extend(self.paths[position:])
+            self.paths = merged
+            self.endResetModel()
+        else:
+            for row, chunk in ranges:
+                row = min(row, len(self.paths))
+                self.beginInsertRows(QtCore.QModelIndex(), row, row + len(chunk) - 1)
+                self.paths[row:row] = chunk
+                self.endInsertRows()
+        self.rows = {path: index for index, path in enumerate(self.paths)}
+
+    def clear(self):
+        self.beginResetModel()
+        self.paths = []
+        self.rows = {}
+        self.metadata = {}
+        self.thumbnails.clear()
+        self.pending_thumbnails.clear()
+        self.unsaved_thumbnails = []
+        self.unreadable.clear()
+        self.endResetModel()
+
+
+class FrameGalleryView(QtWidgets.QListView):
+    """虚拟化的画廊视图：统一项尺寸，只为可见的行请求缩略图"""
+    delete_requested = pyqtSignal(list)  # [行号]，由审阅对话框发出
 
-class CustomListWidget(QtWidgets.QListWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setViewMode(QtWidgets.QListView.IconMode)
-        self.setIconSize(QtCore.QSize(360, 360))
+        self.setIconSize(QtCore.QSize(THUMBNAIL_SIZE, THUMBNAIL_SIZE))
         self.setSpacing(15)
         self.setResizeMode(QtWidgets.QListView.Adjust)
         self.setWrapping(True)
         self.setSelectionMode(QtWidgets.QAbstractItemView.MultiSelection)
+        self.setUniformItemSizes(True)  # 布局时不必逐项询问尺寸
+        self.setLayoutMode(QtWidgets.QListView.Batched)
+        self.setModel(FrameGalleryModel(self))
+
+    def top_row(self):
+        """视口顶部第一列的行号，没有可见项时返回 -1"""
+        x = self.spacing() + GALLERY_ITEM_SIZE.width() // 2
+        for y in range(0, self.viewport().height(), self.spacing()):
+            index = self.indexAt(QtCore.QPoint(x, y))
+            if index.isValid():
+                return index.row()
+        return -1
+
+    def top_path(self, skip_rows=()):
+        """视口顶部第一张不在 skip_rows 中的图片，模型变化后交给 scroll_to_path 恢复位置"""
+        paths = self.model().paths
+        return next((paths[row] for row in range(max(self.top_row(), 0), len(paths)) if row not in skip_rows), None)
+
+    def scroll_to_path(self, image_path):
+        """把图片滚动到顶部；分批布局还没完成时先一次性布局完，否则位置不准"""
+        row = self.model().rows.get(image_path)
+        if row is None:
+            return
+        self.setLayoutMode(QtWidgets.QListView.SinglePass)
+        self.doItemsLayout()
+        self.scrollTo(self.model().index(row), QtWidgets.QAbstractItemView.PositionAtTop)
+        self.setLayoutMode(QtWidgets.QListView.Batched)
 
     def mouseDoubleClickEvent(self, event):
-        item = self.itemAt(event.pos())
-        if item:
-            preview_dialog = ImagePreviewDialog(item.data(QtCore.Qt.UserRole), self)
+        index = self.indexAt(event.pos())
+        if index.isValid():
+            image_path = index.data(FrameGalleryModel.PathRole)
+            preview_dialog = ImagePreviewDialog(image_path, self, self.model().thumbnails.get(image_path), gallery=self)
             preview_dialog.exec_()
+            preview_dialog.deleteLater()  # 以画廊为父对象，不删除会一直留到窗口关闭
+
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
 
 
 class VideoFrameExtractor(QtWidgets.QWidget):
     def __init__(self):
         super().__init__()
         # Initialize basic variables
-        self.has_gpu = check_gpu_availability()  # 检查GPU可用性
+        self.has_gpu = False  # GPU 可用性由后台线程探测后更新
         self.video_paths = []
         self.is_processing = False
         self.extractor_thread = None
+        # 删除、撤销和清理在单线程池中按顺序执行，删除全部结束后汇总一次
+        self.delete_pool = QtCore.QThreadPool(self)
+        self.delete_pool.setMaxThreadCount(1)
+        self.pending_deletes = 0
+        self.deleted_count = 0
+        self.delete_failures = []
+        self.undo_stack = []  # 删除批次，见 delete_selected_images
+        self.undo_running = False
+        self.delete_serial = 0
 
         # Initialize UI elements as None
         self.tab_widget = None
         self.output_folder_input = None
         self.gallery = None
         self.progress_bar = None
+        self.stats_label = None
+        self.undo_button = None
         self.pause_button = None
         self.extract_button = None
         self.interval_slider = None
         self.interval_label = None
+        self.sampling_combo = None
+        self.scene_threshold_spinbox = None
+        self.scene_min_gap_spinbox = None
+        self.scene_max_gap_spinbox = None
+        self.blur_filter_checkbox = None
+        self.min_sharpness_spinbox = None
+        self.exposure_filter_checkbox = None
+        self.min_brightness_spinbox = None
+        self.max_brightness_spinbox = None
+        self.dedup_checkbox = None
+        self.dedup_threshold_spinbox = None
         self.gpu_acceleration_checkbox = None
         self.fast_extraction_checkbox = None
         self.separate_folders_checkbox = None
+        self.resume_checkbox = None
+        self.workers_spinbox = None
+        self.format_combo = None
+        self.quality_spinbox = None
+        self.png_compression_spinbox = None
+        self.jpeg_progressive_checkbox = None
+        self.jpeg_optimize_checkbox = None
+        self.webp_lossless_checkbox = None
+        self.resize_combo = None
+        self.max_side_spinbox = None
+        self.resize_width_spinbox = None
+        self.resize_height_spinbox = None
+        self.interpolation_combo = None
+        self.crop_input = None
         self.page3 = None
 
         # Initialize config
@@ -350,15 +1363,38 @@ class VideoFrameExtractor(QtWidgets.QWidget):
         if self.gpu_acceleration_checkbox:
             self.gpu_acceleration_checkbox.setEnabled(self.has_gpu)  # 根据GPU可用性设置复选框是否可用
 
+        # 事件循环开始、窗口显示后再加载 OpenCV 和探测 GPU
+        self.warmup_thread = BackendWarmupThread(self)
+        self.warmup_thread.ready.connect(self.on_backend_ready)
+        QtCore.QTimer.singleShot(0, self.start_backend_warmup)
+
+    def start_backend_warmup(self):
+        if not self.warmup_thread.isRunning() and not self.warmup_thread.isFinished():
+            self.warmup_thread.start(QThread.LowPriority)
+
+    def on_backend_ready(self, has_gpu):
+        self.has_gpu = has_gpu
+        if self.gpu_acceleration_checkbox:
+            self.gpu_acceleration_checkbox.setEnabled(self.has_gpu)
+
+    def closeEvent(self, event):
+        self.warmup_thread.wait()  # 导入无法中断，等它结束再销毁线程对象
+        if self.extractor_thread:
+            # 停止后最多再处理一帧，等提取线程和子进程退出，断点也会写完
+            self.extractor_thread.stop()
+            self.extractor_thread.wait()
+        self.purge_deleted()
+        self.delete_pool.waitForDone()  # 退出前清空暂存目录，释放磁盘空间
+        self.gallery.model().set_store(None)  # 关闭缩略图缓存的连接，SQLite 随之清理 WAL 文件
+        super().closeEvent(event)
+
     def stop_extraction(self):
         if self.extractor_thread:
+            # 线程很快会结束并发出 finished，由 on_finished 等待线程退出后再释放
             self.extractor_thread.stop()  # 调用线程的停止方法
-            self.extractor_thread.finished.connect(self.on_finished)  # 连接线程结束信号
-            self.extractor_thread.quit()  # 退出线程
-            self.extractor_thread = None  # 清理线程引用
-        self.is_processing = False
-        self.progress_bar.setVisible(False)
-        self.extract_button.setEnabled(True)
+            self.stop_button.setEnabled(False)
+            self.pause_button.setEnabled(False)
+            self.stats_label.setText('正在停止... (Stopping...)')
 
     def load_settings(self):
         if os.path.exists(self.config_file):
@@ -432,6 +1468,90 @@ class VideoFrameExtractor(QtWidgets.QWidget):
 
         self.interval_slider.valueChanged.connect(self.update_interval_label)
 
+        sampling_layout = QtWidgets.QHBoxLayout()
+        sampling_layout.addWidget(QtWidgets.QLabel("采样方式 (Sampling)"))
+        self.sampling_combo = QtWidgets.QComboBox()
+        self.sampling_combo.addItem("固定间隔 (Fixed Interval)", 'interval')
+        self.sampling_combo.addItem("间隔内最清晰帧 (Sharpest in Interval)", 'best')
+        self.sampling_combo.addItem("场景变化 (Scene Change)", 'scene')
+        sampling_layout.addWidget(self.sampling_combo)
+
+        self.scene_threshold_spinbox = QtWidgets.QDoubleSpinBox()
+        self.scene_threshold_spinbox.setRange(0.01, 1.0)
+        self.scene_threshold_spinbox.setSingleStep(0.05)
+        self.scene_threshold_spinbox.setValue(DEFAULT_SAMPLING_OPTIONS['scene_threshold'])
+        self.scene_threshold_spinbox.setPrefix('阈值 (Threshold) ')
+        sampling_layout.addWidget(self.scene_threshold_spinbox)
+
+        self.scene_min_gap_spinbox = QtWidgets.QDoubleSpinBox()
+        self.scene_min_gap_spinbox.setRange(0.0, 600.0)
+        self.scene_min_gap_spinbox.setValue(DEFAULT_SAMPLING_OPTIONS['scene_min_gap'])
+        self.scene_min_gap_spinbox.setPrefix('最短 (Min) ')
+        self.scene_min_gap_spinbox.setSuffix('s')
+        sampling_layout.addWidget(self.scene_min_gap_spinbox)
+
+        self.scene_max_gap_spinbox = QtWidgets.QDoubleSpinBox()
+        self.scene_max_gap_spinbox.setRange(0.0, 3600.0)
+        self.scene_max_gap_spinbox.setValue(DEFAULT_SAMPLING_OPTIONS['scene_max_gap'])
+        self.scene_max_gap_spinbox.setPrefix('最长 (Max) ')
+        self.scene_max_gap_spinbox.setSuffix('s')
+        self.scene_max_gap_spinbox.setSpecialValueText('最长不限 (No Max)')
+        sampling_layout.addWidget(self.scene_max_gap_spinbox)
+        settings_layout.addLayout(sampling_layout)
+
+        self.sampling_combo.currentIndexChanged.connect(self.update_sampling_options)
+        self.update_sampling_options()
+
+        quality_layout = QtWidgets.QHBoxLayout()
+        self.blur_filter_checkbox = QtWidgets.QCheckBox("跳过模糊帧 (Skip Blurry)")
+        self.blur_filter_checkbox.setChecked(DEFAULT_FILTER_OPTIONS['blur_filter'])
+        quality_layout.addWidget(self.blur_filter_checkbox)
+        self.min_sharpness_spinbox = QtWidgets.QDoubleSpinBox()
+        self.min_sharpness_spinbox.setRange(0.0, 100000.0)
+        self.min_sharpness_spinbox.setDecimals(0)
+        self.min_sharpness_spinbox.setValue(DEFAULT_FILTER_OPTIONS['min_sharpness'])
+        self.min_sharpness_spinbox.setPrefix('清晰度 (Sharpness) ≥ ')
+        self.min_sharpness_spinbox.setEnabled(self.blur_filter_checkbox.isChecked())
+        self.blur_filter_checkbox.toggled.connect(self.min_sharpness_spinbox.setEnabled)
+        quality_layout.addWidget(self.min_sharpness_spinbox)
+
+        self.exposure_filter_checkbox = QtWidgets.QCheckBox("跳过过暗/过曝帧 (Skip Bad Exposure)")
+        self.exposure_filter_checkbox.setChecked(DEFAULT_FILTER_OPTIONS['exposure_filter'])
+        quality_layout.addWidget(self.exposure_filter_checkbox)
+        self.min_brightness_spinbox = QtWidgets.QDoubleSpinBox()
+        self.min_brightness_spinbox.setRange(0.0, 255.0)
+        self.min_brightness_spinbox.setDecimals(0)
+        self.min_brightness_spinbox.setValue(DEFAULT_FILTER_OPTIONS['min_brightness'])
+        self.min_brightness_spinbox.setPrefix('亮度 (Brightness) ')
+        quality_layout.addWidget(self.min_brightness_spinbox)
+        self.max_brightness_spinbox = QtWidgets.QDoubleSpinBox()
+        self.max_brightness_spinbox.setRange(0.0, 255.0)
+        self.max_brightness_spinbox.setDecimals(0)
+        self.max_brightness_spinbox.setValue(DEFAULT_FILTER_OPTIONS['max_brightness'])
+        self.max_brightness_spinbox.setPrefix('~ ')
+        quality_layout.addWidget(self.max_brightness_spinbox)
+        for spinbox in (self.min_brightness_spinbox, self.max_brightness_spinbox):
+            spinbox.setEnabled(self.exposure_filter_checkbox.isChecked())
+            self.exposure_filter_checkbox.toggled.connect(spinbox.setEnabled)
+        settings_layout.addLayout(quality_layout)
+
+        dedup_layout = QtWidgets.QHBoxLayout()
+        self.dedup_checkbox = QtWidgets.QCheckBox("跳过近似重复帧 (Skip Near-Duplicates)")
+        self.dedup_checkbox.setChecked(DEFAULT_FILTER_OPTIONS['dedup'])
+        self.dedup_checkbox.setToolTip(
+            '整批视频之间互相去重，为保证结果可重复，启用后只用一个进程顺序提取 '
+            '(Duplicates are detected across the whole batch; to keep results repeatable, extraction runs in a single process)'
+        )
+        dedup_layout.addWidget(self.dedup_checkbox)
+        self.dedup_threshold_spinbox = QtWidgets.QSpinBox()
+        self.dedup_threshold_spinbox.setRange(0, 16)
+        self.dedup_threshold_spinbox.setValue(DEFAULT_FILTER_OPTIONS['dedup_threshold'])
+        self.dedup_threshold_spinbox.setPrefix('汉明距离 (Hamming) ≤ ')
+        self.dedup_threshold_spinbox.setEnabled(self.dedup_checkbox.isChecked())
+        self.dedup_checkbox.toggled.connect(self.dedup_threshold_spinbox.setEnabled)
+        dedup_layout.addWidget(self.dedup_threshold_spinbox)
+        settings_layout.addLayout(dedup_layout)
+
         # 创建并隐藏GPU加速复选框
         self.gpu_acceleration_checkbox = QtWidgets.QCheckBox(
             "启用 GPU 加速 (Enable GPU Acceleration)"
@@ -463,6 +1583,97 @@ class VideoFrameExtractor(QtWidgets.QWidget):
         )
         settings_layout.addWidget(self.separate_folders_checkbox)
 
+        self.resume_checkbox = QtWidgets.QCheckBox(
+            "断点续传：跳过已完成的视频，未完成的从中断处继续 (Resume unfinished jobs)"
+        )
+        self.resume_checkbox.setChecked(True)
+        settings_layout.addWidget(self.resume_checkbox)
+
+        workers_layout = QtWidgets.QHBoxLayout()
+        workers_layout.addWidget(QtWidgets.QLabel("并行进程数 (Worker Processes)"))
+        self.workers_spinbox = QtWidgets.QSpinBox()
+        self.workers_spinbox.setRange(1, os.cpu_count() or 1)
+        self.workers_spinbox.setValue(max(1, (os.cpu_count() or 1) // 2))
+        self.workers_spinbox.setEnabled(not self.dedup_checkbox.isChecked())
+        self.dedup_checkbox.toggled.connect(lambda checked: self.workers_spinbox.setEnabled(not checked))
+        workers_layout.addWidget(self.workers_spinbox)
+        settings_layout.addLayout(workers_layout)
+
+        format_layout = QtWidgets.QHBoxLayout()
+        format_layout.addWidget(QtWidgets.QLabel("输出格式 (Output Format)"))
+        self.format_combo = QtWidgets.QComboBox()
+        self.format_combo.addItems(IMAGE_FORMATS)
+        format_layout.addWidget(self.format_combo)
+
+        self.quality_label = QtWidgets.QLabel("质量 (Quality)")
+        format_layout.addWidget(self.quality_label)
+        self.quality_spinbox = QtWidgets.QSpinBox()
+        self.quality_spinbox.setRange(1, 100)
+        self.quality_spinbox.setValue(DEFAULT_ENCODER_OPTIONS['jpeg_quality'])
+        format_layout.addWidget(self.quality_spinbox)
+
+        self.png_compression_label = QtWidgets.QLabel("压缩级别 (Compression)")
+        format_layout.addWidget(self.png_compression_label)
+        self.png_compression_spinbox = QtWidgets.QSpinBox()
+        self.png_compression_spinbox.setRange(0, 9)
+        self.png_compression_spinbox.setValue(DEFAULT_ENCODER_OPTIONS['png_compression'])
+        format_layout.addWidget(self.png_compression_spinbox)
+        settings_layout.addLayout(format_layout)
+
+        format_flags_layout = QtWidgets.QHBoxLayout()
+        self.jpeg_progressive_checkbox = QtWidgets.QCheckBox("渐进式 (Progressive)")
+        format_flags_layout.addWidget(self.jpeg_progressive_checkbox)
+        self.jpeg_optimize_checkbox = QtWidgets.QCheckBox("优化编码 (Optimize)")
+        format_flags_layout.addWidget(self.jpeg_optimize_checkbox)
+        self.webp_lossless_checkbox = QtWidgets.QCheckBox("无损 (Lossless)")
+        format_flags_layout.addWidget(self.webp_lossless_checkbox)
+        settings_layout.addLayout(format_flags_layout)
+
+        self.format_combo.currentTextChanged.connect(self.update_format_options)
+        self.update_format_options(self.format_combo.currentText())
+
+        resize_layout = QtWidgets.QHBoxLayout()
+        resize_layout.addWidget(QtWidgets.QLabel("缩放 (Resize)"))
+        self.resize_combo = QtWidgets.QComboBox()
+        self.resize_combo.addItem("不缩放 (None)", 'none')
+        self.resize_combo.addItem("限制最长边 (Max Side)", 'max_side')
+        self.resize_combo.addItem("固定尺寸 (Fixed Size)", 'fixed')
+        resize_layout.addWidget(self.resize_combo)
+
+        self.max_side_spinbox = QtWidgets.QSpinBox()
+        self.max_side_spinbox.setRange(16, 16384)
+        self.max_side_spinbox.setValue(DEFAULT_TRANSFORM_OPTIONS['max_side'])
+        self.max_side_spinbox.setSuffix(' px')
+        resize_layout.addWidget(self.max_side_spinbox)
+
+        self.resize_width_spinbox = QtWidgets.QSpinBox()
+        self.resize_width_spinbox.setRange(0, 16384)
+        self.resize_width_spinbox.setValue(DEFAULT_TRANSFORM_OPTIONS['resize_width'])
+        self.resize_width_spinbox.setPrefix('W ')
+        resize_layout.addWidget(self.resize_width_spinbox)
+
+        self.resize_height_spinbox = QtWidgets.QSpinBox()
+        self.resize_height_spinbox.setRange(0, 16384)
+        self.resize_height_spinbox.setValue(DEFAULT_TRANSFORM_OPTIONS['resize_height'])
+        self.resize_height_spinbox.setPrefix('H ')
+        self.resize_height_spinbox.setSpecialValueText('H auto')
+        resize_layout.addWidget(self.resize_height_spinbox)
+
+        self.interpolation_combo = QtWidgets.QComboBox()
+        self.interpolation_combo.addItems(list(INTERPOLATIONS))
+        resize_layout.addWidget(self.interpolation_combo)
+        settings_layout.addLayout(resize_layout)
+
+        self.resize_combo.currentIndexChanged.connect(self.update_resize_options)
+        self.update_resize_options()
+
+        crop_layout = QtWidgets.QHBoxLayout()
+        crop_layout.addWidget(QtWidgets.QLabel("裁剪区域 (Crop ROI)"))
+        self.crop_input = QtWidgets.QLineEdit()
+        self.crop_input.setPlaceholderText('x,y,w,h（留空不裁剪） (x,y,w,h, empty for none)')
+        crop_layout.addWidget(self.crop_input)
+        settings_layout.addLayout(crop_layout)
+
         control_group = QtWidgets.QGroupBox("控制 (Control)")
         control_layout = QtWidgets.QVBoxLayout()
 
@@ -481,8 +1692,13 @@ class VideoFrameExtractor(QtWidgets.QWidget):
 
         self.progress_bar = QtWidgets.QProgressBar()
         self.progress_bar.setVisible(False)
+        self.progress_bar.setRange(0, 1000)  # 千分比，进度来自整批视频的总帧数
         control_layout.addWidget(self.progress_bar)
 
+        self.stats_label = QtWidgets.QLabel()
+        self.stats_label.setWordWrap(True)
+        control_layout.addWidget(self.stats_label)
+
         control_group.setLayout(control_layout)
         layout.addWidget(control_group)
 
@@ -499,12 +1715,46 @@ class VideoFrameExtractor(QtWidgets.QWidget):
         gallery_group = QtWidgets.QGroupBox("提取的帧 (Extracted Frames) (双击预览大图，点击或者勾画选中一个区域的图片，然后点击删除按钮) (Double-click to preview large image, click or select a region to delete)")  # 修改组框标题为中英双语
         gallery_layout = QtWidgets.QVBoxLayout()
 
-        self.gallery = CustomListWidget()
+        sort_layout = QtWidgets.QHBoxLayout()
+        sort_layout.addWidget(QtWidgets.QLabel('排序 (Sort by):'))
+        self.sort_combo = QtWidgets.QComboBox()
+        for key, label in GALLERY_SORT_KEYS:
+            self.sort_combo.addItem(label, key)
+        self.sort_combo.setToolTip(
+            '按提取时记录的帧索引排序，不必打开图片 (Sort by the frame index written during extraction, without opening images)'
+        )
+        self.sort_combo.currentIndexChanged.connect(self.sort_gallery)
+        sort_layout.addWidget(self.sort_combo)
+        sort_layout.addStretch(1)
+        gallery_layout.addLayout(sort_layout)
+
+        self.gallery = FrameGalleryView()
+        self.gallery.delete_requested.connect(self.delete_rows)
         gallery_layout.addWidget(self.gallery)
 
+        self.open_folder_button = QtWidgets.QPushButton('打开已提取的帧文件夹 (Open Extracted Frames Folder)')
+        self.open_folder_button.clicked.connect(self.open_frames_folder)
+        gallery_layout.addWidget(self.open_folder_button)
+
+        delete_layout = QtWidgets.QHBoxLayout()
         self.delete_button = QtWidgets.QPushButton('删除选中的帧 (Delete Selected Frames)')
         self.delete_button.clicked.connect(self.delete_selected_images)
-        gallery_layout.addWidget(self.delete_button)
+        delete_layout.addWidget(self.delete_button, 1)
+        self.undo_button = QtWidgets.QPushButton('撤销删除 (Undo Delete)')
+        self.undo_button.setShortcut(QtGui.QKeySequence.Undo)
+        self.undo_button.setEnabled(False)
+        self.undo_button.clicked.connect(self.undo_delete)
+        delete_layout.addWidget(self.undo_button)
+        self.trash_checkbox = QtWidgets.QCheckBox('清理时移到回收站 (Purge to Trash)')
+        self.trash_checkbox.setToolTip(
+            '无法再撤销的删除清理时移到系统回收站，而不是直接删除 '
+            '(When deleted frames can no longer be undone, move them to the system trash instead of deleting them)'
+        )
+        delete_layout.addWidget(self.trash_checkbox)
+        gallery_layout.addLayout(delete_layout)
+
+        self.delete_status_label = QtWidgets.QLabel('')
+        gallery_layout.addWidget(self.delete_status_label)
 
         gallery_group.setLayout(gallery_layout)
         layout.addWidget(gallery_group)
@@ -515,48 +1765,126 @@ class VideoFrameExtractor(QtWidgets.QWidget):
 
 
 
+    def open_frames_folder(self):
+        folder = QtWidgets.QFileDialog.getExistingDirectory(
+            self, "Select Frames Folder", self.output_folder_input.text()
+        )
+        if folder:
+            self.load_frames_folder(folder)
+
+    def load_frames_folder(self, folder):
+        """把文件夹（含子文件夹）中的图片载入画廊，缩略图优先从持久化缓存读取"""
+        self.purge_deleted()
+        image_paths = []
+        stale_folders = []
+        for root, dirs, files in os.walk(folder):
+            if STAGING_DIR in dirs:
+                # 上次没来得及清理的删除已经无法撤销
+                dirs.remove(STAGING_DIR)
+                stale_folders.append(os.path.join(root, STAGING_DIR))
+            image_paths.extend(
+                os.path.join(root, name) for name in files
+                if os.path.splitext(name)[1].lower() in PREVIEW_EXTENSIONS
+            )
+        image_paths.sort()
+        model = self.gallery.model()
+        model.clear()
+        model.set_store(open_thumbnail_store(folder))
+        model.add_paths(image_paths)
+        self.load_frame_metadata(folder)
+        if stale_folders:
+            self.delete_pool.start(StagingPurger(stale_folders, self.trash_checkbox.isChecked()))
+
+    def load_frame_metadata(self, folder):
+        """读取帧索引供提示和排序使用；按文件名排序时保持现有顺序，不打乱正在浏览的画廊"""
+        self.gallery.model().set_metadata(read_frame_indexes(folder))
+        if self.sort_combo.currentData() != 'name':
+            self.sort_gallery()
+
+    def sort_gallery(self):
+        self.gallery.model().sort_paths(self.sort_combo.currentData())
+        self.gallery.scrollToTop()
+
     def switch_to_preview(self):
         self.stacked_widget.setCurrentWidget(self.page2)
 
     def toggle_pause(self):
         if self.extractor_thread:
-            self.extractor_thread.is_paused = not self.extractor_thread.is_paused
-            self.pause_button.setText('Resume' if self.extractor_thread.is_paused else 'Pause')
-
-
-    def create_thumbnail(self, image_path):
-        try:
-            image = QtGui.QImage(image_path)
-            if image.isNull():
-                return None
-            # 设定缩略图的大小
-            scaled_image = image.scaled(360, 360, QtCore.Qt.KeepAspectRatio, QtCore.Qt.SmoothTransformation)
-            return QtGui.QIcon(QtGui.QPixmap.fromImage(scaled_image))
-        except Exception as e:
-            print(f"Error creating thumbnail: {str(e)}")
-            return None
-
-    def add_gallery_item(self, image_path):
-        try:
-            item = QtWidgets.QListWidgetItem()
-            thumbnail = self.create_thumbnail(image_path)
-            if thumbnail:
-                item.setIcon(thumbnail)
-
-
-            file_name = os.path.basename(image_path)
-            if len(file_name) > 20:
-                file_name = file_name[:17] + '...'
-
-            item.setText(file_name)
-            item.setData(QtCore.Qt.UserRole, image_path)
-
-
-            item.setSizeHint(QtCore.QSize(360, 220))
-
-            self.gallery.addItem(item)
-        except Exception as e:
-            print(f"Error adding gallery item: {str(e)}")
+            if self.extractor_thread.is_paused():
+                self.extractor_thread.resume()
+                self.pause_button.setText('暂停 (Pause)')
+            else:
+                self.extractor_thread.pause()
+                self.pause_button.setText('继续 (Resume)')
+
+
+    def add_gallery_items(self, image_paths):
+        self.gallery.model().add_paths(image_paths)
+
+    def update_format_options(self, image_format):
+        """只显示当前输出格式用得到的编码参数"""
+        self.quality_label.setVisible(image_format in ('jpg', 'webp'))
+        self.quality_spinbox.setVisible(image_format in ('jpg', 'webp'))
+        self.png_compression_label.setVisible(image_format == 'png')
+        self.png_compression_spinbox.setVisible(image_format == 'png')
+        self.jpeg_progressive_checkbox.setVisible(image_format == 'jpg')
+        self.jpeg_optimize_checkbox.setVisible(image_format == 'jpg')
+        self.webp_lossless_checkbox.setVisible(image_format == 'webp')
+
+    def update_sampling_options(self):
+        """场景模式下帧间隔滑块不起作用，改为显示场景检测参数"""
+        scene_mode = self.sampling_combo.currentData() == 'scene'
+        self.interval_slider.setEnabled(not scene_mode)
+        self.scene_threshold_spinbox.setVisible(scene_mode)
+        self.scene_min_gap_spinbox.setVisible(scene_mode)
+        self.scene_max_gap_spinbox.setVisible(scene_mode)
+
+    def update_resize_options(self):
+        resize_mode = self.resize_combo.currentData()
+        self.max_side_spinbox.setVisible(resize_mode == 'max_side')
+        self.resize_width_spinbox.setVisible(resize_mode == 'fixed')
+        self.resize_height_spinbox.setVisible(resize_mode == 'fixed')
+        self.interpolation_combo.setVisible(resize_mode != 'none')
+
+    def transform_options(self):
+        return {
+            'crop': parse_crop(self.crop_input.text()),
+            'resize_mode': self.resize_combo.currentData(),
+            'max_side': self.max_side_spinbox.value(),
+            'resize_width': self.resize_width_spinbox.value(),
+            'resize_height': self.resize_height_spinbox.value(),
+            'interpolation': self.interpolation_combo.currentText(),
+        }
+
+    def sampling_options(self):
+        return {
+            'sampling_mode': self.sampling_combo.currentData(),
+            'scene_threshold': self.scene_threshold_spinbox.value(),
+            'scene_min_gap': self.scene_min_gap_spinbox.value(),
+            'scene_max_gap': self.scene_max_gap_spinbox.value(),
+        }
+
+    def filter_options(self):
+        return {
+            'blur_filter': self.blur_filter_checkbox.isChecked(),
+            'min_sharpness': self.min_sharpness_spinbox.value(),
+            'exposure_filter': self.exposure_filter_checkbox.isChecked(),
+            'min_brightness': self.min_brightness_spinbox.value(),
+            'max_brightness': self.max_brightness_spinbox.value(),
+            'dedup': self.dedup_checkbox.isChecked(),
+            'dedup_threshold': self.dedup_threshold_spinbox.value(),
+        }
+
+    def encoder_options(self):
+        return {
+            'image_format': self.format_combo.currentText(),
+            'jpeg_quality': self.quality_spinbox.value(),
+            'jpeg_progressive': self.jpeg_progressive_checkbox.isChecked(),
+            'jpeg_optimize': self.jpeg_optimize_checkbox.isChecked(),
+            'png_compression': self.png_compression_spinbox.value(),
+            'webp_quality': self.quality_spinbox.value(),
+            'webp_lossless': self.webp_lossless_checkbox.isChecked(),
+        }
 
     def update_interval_label(self, value):
         self.interval_label.setText(f'{value / 10:.1f}s')
@@ -568,7 +1896,8 @@ class VideoFrameExtractor(QtWidgets.QWidget):
         tutorial_text = (
             "<h2>软件使用教程</h2>"
             "<p>1. 选择视频文件。</p>"
-            "<p>2. 设置帧间隔。</p>"
+            "<p>2. 设置帧间隔；采样方式选“间隔内最清晰帧”时，每个间隔只保存其中最清晰的一帧；"
+            "选“场景变化”时只在画面明显变化时保存（阈值越小保存越多）。</p>"
             "<p>3. 选择输出目录。</p>"
             "<p>4. 若希望在批量处理的时候，根据不同的视频将提取的帧保存在不同的文件夹，则勾选批量处理分文件夹。</p>"
             "<p>5. 点击提取帧按钮开始提取。</p>"
@@ -631,10 +1960,23 @@ class VideoFrameExtractor(QtWidgets.QWidget):
             QtWidgets.QMessageBox.critical(self, "Error", f"Could not create output folder: {str(e)}")
             return
 
+        try:
+            transform_options = self.transform_options()
+        except ValueError as e:
+            QtWidgets.QMessageBox.warning(self, "Warning", str(e))
+            return
+
         self.is_processing = True
+        self.progress_bar.setValue(0)
         self.progress_bar.setVisible(True)
+        self.stats_label.setText('正在读取视频信息... (Reading video info...)')
         self.extract_button.setEnabled(False)
-        self.gallery.clear()
+        self.purge_deleted()  # 画廊清空后无法再撤销
+        self.gallery.model().clear()
+        # 关闭图片预览时画廊不显示新帧，也不在输出目录创建缩略图缓存
+        self.gallery.model().set_store(
+            None if self.fast_extraction_checkbox.isChecked() else open_thumbnail_store(output_folder)
+        )
 
         interval = self.interval_slider.value() / 10  # 以秒为单位
         use_gpu = self.gpu_acceleration_checkbox.isChecked()
@@ -644,7 +1986,14 @@ class VideoFrameExtractor(QtWidgets.QWidget):
             output_folder,
             interval,
             use_gpu,
-            self.separate_folders_checkbox.isChecked()
+            self.separate_folders_checkbox.isChecked(),
+            workers=self.workers_spinbox.value(),
+            encoder_options=self.encoder_options(),
+            transform_options=transform_options,
+            thumbnail_size=0 if self.fast_extraction_checkbox.isChecked() else THUMBNAIL_SIZE,
+            sampling_options=self.sampling_options(),
+            filter_options=self.filter_options(),
+            resume=self.resume_checkbox.isChecked()
         )
 
         # 连接信号
@@ -654,99 +2003,209 @@ class VideoFrameExtractor(QtWidgets.QWidget):
 
         # 仅在快速提取模式未选中时连接新帧提取信号
         if not self.fast_extraction_checkbox.isChecked():
-            self.extractor_thread.new_frame_extracted.connect(self.add_gallery_item)
+            self.extractor_thread.thumbnails_ready.connect(self.gallery.model().queue_extracted_thumbnails)
+            self.extractor_thread.new_frames_extracted.connect(self.add_gallery_items)
 
         self.extractor_thread.start()
 
-    def update_progress(self, frame_count):
-        self.progress_bar.setValue(frame_count)
+    def update_progress(self, stats):
+        self.progress_bar.setValue(int(stats['percent'] * 10))
+        lines = [
+            f"总进度 (Overall): {stats['percent']:.1f}%  "
+            f"视频 (Videos): {stats['videos_finished']}/{stats['videos_total']}  "
+            f"已保存 (Saved): {stats['frames_written']}"
+        ]
+        if stats['frames_skipped']:
+            lines[0] += f"  已跳过 (Skipped): {sum(stats['frames_skipped'].values())}"
+        if stats.get('video'):
+            video_percent = 100.0 * stats['video_done'] / stats['video_total'] if stats['video_total'] else 0.0
+            lines.append(f"当前文件 (Current): {os.path.basename(stats['video'])} {video_percent:.1f}%")
+        eta = format_duration(stats['eta']) if stats['eta'] is not None else '--:--:--'
+        lines.append(
+            f"解码 (Decode): {stats['decode_fps']:.0f} fps  "
+            f"写入 (Write): {stats['write_mbps']:.1f} MB/s  "
+            f"剩余 (ETA): {eta}"
+        )
+        self.stats_label.setText('\n'.join(lines))
 
     def on_finished(self):
+        output_folder = None
+        if self.extractor_thread:
+            self.extractor_thread.wait()  # run() 已经返回，这里只是等线程真正退出
+            output_folder = self.extractor_thread.options['output_folder']
+            self.extractor_thread = None
         self.is_processing = False
         self.progress_bar.setVisible(False)
         self.extract_button.setEnabled(True)
+        self.pause_button.setText('暂停 (Pause)')
+        self.pause_button.setEnabled(True)
+        self.stop_button.setEnabled(True)
+        # 界面状态先恢复，读取帧索引出错也不会让提取按钮一直不可用
+        if output_folder and self.gallery.model().paths:
+            self.load_frame_metadata(output_folder)
 
     def show_error(self, message):
         QtWidgets.QMessageBox.critical(self, "Error", message)
 
-    def process_videos(self, output_folder):
-        interval = self.interval_slider.value() / 10
-        use_gpu = self.gpu_acceleration_checkbox.isChecked()
-
-        for video_path in self.video_paths:
-            try:
-                cap = cv2.VideoCapture(video_path)
-                if not cap.isOpened():
-                    QtWidgets.QMessageBox.warning(self, "Warning", f"Could not open video: {video_path}")
-                    continue
-
-                total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-                fps = cap.get(cv2.CAP_PROP_FPS)
-                if fps <= 0:
-                    QtWidgets.QMessageBox.warning(self, "Warning", f"Invalid FPS for video: {video_path}")
-                    continue
-
-                interval_frames = int(fps * interval)
-                frame_count = 0
-                extracted_count = 0
-
-                self.progress_bar.setMaximum(total_frames)
-
-                while True:
-                    if self.is_paused:
-                        QtWidgets.QApplication.processEvents()
-                        continue  # 暂停处理
-
-                    ret, frame = cap.read()
-                    if not ret:
-                        break
-
-                    if frame_count % interval_frames == 0:
-                        if use_gpu:
-
-                            pass  # TODO:
-
-                        output_path = os.path.join(
-                            output_folder,
-                            f"{os.path.splitext(os.path.basename(video_path))[0]}_frame_{extracted_count:04d}.jpg"
-                        )
-                        cv2.imwrite(output_path, frame)
-                        self.add_gallery_item(output_path)
-                        extracted_count += 1
-
-                    frame_count += 1
-                    self.progress_bar.setValue(frame_count)
-                    QtWidgets.QApplication.processEvents()
+    def delete_selected_images(self):
+        # selectedRows() 逐个检查行，选中上万行时很慢；直接展开选区的区间
+        self.delete_rows([row for selection_range in self.gallery.selectionModel().selection()
+                          for row in range(selection_range.top(), selection_range.bottom() + 1)])
+
+    def delete_rows(self, rows):
+        """从画廊中按区间一次移除这些行，再在后台把文件移到暂存目录，可以撤销
+
+        每次删除是一个批次：记录原来的行号和 (原路径, 暂存路径)，文件放在所在文件夹下的
+        STAGING_DIR/批次号 中，与原文件在同一文件系统，移动只是重命名。
+        """
+        model = self.gallery.model()
+        rows = sorted(set(rows))
+        if not rows:
+            return
+        # 区间太碎时模型会整体重置，记住视口顶部第一张保留的图片，之后滚动回去
+        anchor = self.gallery.top_path(set(rows)) if len(row_ranges(rows)) > MAX_ROW_RANGES else None
+        self.gallery.clearSelection()
+        image_paths = model.remove_rows(rows)
+        if anchor is not None:
+            self.gallery.scroll_to_path(anchor)
+
+        self.delete_serial += 1
+        batch_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{self.delete_serial}"
+        moves = [
+            (image_path, os.path.join(os.path.dirname(image_path), STAGING_DIR, batch_id, os.path.basename(image_path)))
+            for image_path in image_paths
+        ]
+        batch = {
+            'rows': rows,
+            'moves': moves,
+            'folders': sorted({os.path.dirname(staged) for _, staged in moves}),
+            'use_trash': self.trash_checkbox.isChecked(),
+        }
+        self.undo_stack.append(batch)
+        while len(self.undo_stack) > UNDO_LIMIT:
+            self.purge_batches([self.undo_stack.pop(0)])
+
+        signals = MoveSignals(self)
+        signals.progress.connect(self.update_delete_progress)
+        signals.finished.connect(lambda moved, failed: self.on_delete_finished(signals, batch, moved, failed))
+        self.pending_deletes += len(image_paths)
+        self.delete_status_label.setText(f'正在删除 (Deleting) {len(image_paths)}...')
+        self.update_undo_button()
+        self.delete_pool.start(FileMover(moves, signals))
+
+    def update_delete_progress(self, done, total):
+        self.delete_status_label.setText(f'正在删除 (Deleting) {done}/{total}')
+
+    def on_delete_finished(self, signals, batch, moved, failed):
+        signals.deleteLater()
+        self.pending_deletes -= len(batch['moves'])
+        self.deleted_count += len(batch['moves']) - len(failed)
+        self.delete_failures.extend(failed)
+        # 批次里只保留真正移动了的文件，撤销时只恢复它们
+        moved_paths = {source for source, _ in moved}
+        kept = [(row, move) for row, move in zip(batch['rows'], batch['moves']) if move[0] in moved_paths]
+        batch['rows'] = [row for row, _ in kept]
+        batch['moves'] = [move for _, move in kept]
+        if self.pending_deletes:
+            return  # 还有排队的删除，等全部结束再汇总
+        deleted, failed = self.deleted_count, self.delete_failures
+        self.deleted_count, self.delete_failures = 0, []
+        self.delete_status_label.setText(f'已删除 {deleted} 个文件，可撤销 (Deleted {deleted} files, undo available)')
+        self.update_undo_button()
+        if failed:
+            # 没删掉的文件放回画廊
+            self.gallery.model().add_paths([image_path for image_path, _ in failed if os.path.exists(image_path)])
+            details = '\n'.join(f"{image_path}: {message}" for image_path, message in failed[:10])
+            if len(failed) > 10:
+                details += f"\n... ({len(failed) - 10} more)"
+            QtWidgets.QMessageBox.warning(
+                self, "Warning", f"Could not delete {len(failed)} of {deleted + len(failed)} files:\n{details}"
+            )
 
-                cap.release()
+    def undo_delete(self):
+        """把最近一次删除的文件移回原处，并插回原来的行"""
+        if self.pending_deletes or self.undo_running or not self.undo_stack:
+            return
+        batch = self.undo_stack.pop()
+        self.undo_running = True
+        self.update_undo_button()
+        signals = MoveSignals(self)
+        signals.finished.connect(lambda moved, failed: self.on_undo_finished(signals, batch, moved, failed))
+        self.delete_status_label.setText(f"正在撤销 (Restoring) {len(batch['moves'])}...")
+        self.delete_pool.start(FileMover([(staged, image_path) for image_path, staged in batch['moves']], signals))
+
+    def on_undo_finished(self, signals, batch, moved, failed):
+        signals.deleteLater()
+        self.undo_running = False
+        restored = {image_path for _, image_path in moved}
+        entries = [(row, image_path) for row, (image_path, _) in zip(batch['rows'], batch['moves'])
+                   if image_path in restored]
+        anchor = self.gallery.top_path() if len(row_ranges(row for row, _ in entries)) > MAX_ROW_RANGES else None
+        self.gallery.model().insert_paths(entries)
+        if anchor is not None:
+            self.gallery.scroll_to_path(anchor)
+        self.delete_status_label.setText(f'已恢复 {len(entries)} 个文件 (Restored {len(entries)} files)')
+        self.update_undo_button()
+        self.purge_batches([batch])  # 暂存目录中只剩没能恢复的文件
+        if failed:
+            details = '\n'.join(f"{image_path}: {message}" for image_path, message in failed[:10])
+            if len(failed) > 10:
+                details += f"\n... ({len(failed) - 10} more)"
+            QtWidgets.QMessageBox.warning(self, "Warning", f"Could not restore {len(failed)} files:\n{details}")
+
+    def update_undo_button(self):
+        count = len(self.undo_stack)
+        self.undo_button.setText(f'撤销删除 (Undo Delete) ({count})' if count else '撤销删除 (Undo Delete)')
+        self.undo_button.setEnabled(bool(count) and not self.pending_deletes and not self.undo_running)
+
+    def purge_batches(self, batches):
+        """在后台清理删除批次的暂存目录，排在之前的移动之后执行"""
+        for use_trash in (False, True):
+            folders = [folder for batch in batches if batch['use_trash'] == use_trash for folder in batch['folders']]
+            if folders:
+                self.delete_pool.start(StagingPurger(folders, use_trash))
+
+    def purge_deleted(self):
+        """清空撤销栈并释放暂存的文件，用于画廊清空和退出时"""
+        batches, self.undo_stack = self.undo_stack, []
+        self.purge_batches(batches)
+        if self.undo_button is not None:
+            self.update_undo_button()
+
+
+def profile_startup():
+    """--startup-profile：打印导入、界面构建和后台加载各阶段的耗时"""
+    timings = [('import PyQt5 + fx_engine', _IMPORTS_FINISHED - _STARTUP_STARTED)]
+
+    started = time.perf_counter()
+    app = QtWidgets.QApplication(sys.argv)
+    timings.append(('create QApplication', time.perf_counter() - started))
+
+    started = time.perf_counter()
+    extractor = VideoFrameExtractor()
+    timings.append(('build UI', time.perf_counter() - started))
+
+    started = time.perf_counter()
+    extractor.resize(300, 600)
+    extractor.show()
+    app.processEvents()
+    timings.append(('show window', time.perf_counter() - started))
+    window_shown = time.perf_counter() - _STARTUP_STARTED
+
+    extractor.start_backend_warmup()
+    extractor.warmup_thread.wait()
+    timings.extend((f"{name} (background)", seconds) for name, seconds in extractor.warmup_thread.timings)
+
+    for name, seconds in timings:
+        print(f"{name:<32}{seconds * 1000:>10.1f} ms")
+    print(f"{'window visible after':<32}{window_shown * 1000:>10.1f} ms")
+    return 0
 
-            except Exception as e:
-                QtWidgets.QMessageBox.critical(self, "Error", f"Error processing video {video_path}: {str(e)}")
-                continue
 
-    def delete_selected_images(self):
-        try:
-            selected_items = self.gallery.selectedItems()
-            if not selected_items:
-                return
-
-            # Directly delete selected images without confirmation
-            deleted_count = 0
-            for item in selected_items:
-                img_path = item.data(QtCore.Qt.UserRole)
-                try:
-                    if os.path.exists(img_path):
-                        os.remove(img_path)
-                        deleted_count += 1
-                        self.gallery.takeItem(self.gallery.row(item))
-                except Exception as e:
-                    QtWidgets.QMessageBox.warning(self, "Warning", f"Could not delete {img_path}: {str(e)}")
-
-            # Removed the message box that indicates the number of deleted images
-            # QtWidgets.QMessageBox.information(self, "Success", f"Deleted {deleted_count} images")
-        except Exception as e:
-            QtWidgets.QMessageBox.critical(self, "Error", f"Error during deletion: {str(e)}")
 if __name__ == '__main__':
+    multiprocessing.freeze_support()  # 打包后的子进程入口
+    if '--startup-profile' in sys.argv:
+        sys.exit(profile_startup())
     try:
         app = QtWidgets.QApplication(sys.argv)
         extractor = VideoFrameExtractor()
@@ -0,0 +1,188 @@
+"""视频帧提取命令行入口，与图形界面共用 fx_engine 的提取流程
+
+示例:
+    python fx_cli.py "videos/**/*.mp4" -o output -i 2.5 --format webp --workers 8 --json
+    python fx_cli.py --benchmark-formats sample.mp4
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from fx_engine import (
+    DEFAULT_FILTER_OPTIONS, DEFAULT_SAMPLING_OPTIONS, IMAGE_FORMATS, INTERPOLATIONS, SAMPLING_MODES, SPARSE_MODE_AUTO, SPARSE_MODE_GRAB, SPARSE_MODE_SEEK,
+    ExtractionEngine, check_gpu_availability, make_options, parse_crop, print_encoder_benchmark
+)
+
+
+def expand_inputs(patterns):
+    """展开通配符（支持 **），去重并保持顺序"""
+    video_paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else [pattern]
+        for path in matches:
+            if os.path.isfile(path) and path not in video_paths:
+                video_paths.append(path)
+    return video_paths
+
+
+def parse_size(text):
+    """把 'WxH' 解析为 (宽, 高)，某一边为 0 表示按比例计算"""
+    try:
+        width, height = (int(value) for value in text.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size: {text}, expected WxH")
+    return width, height
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Extract frames from videos without the GUI.")
+    parser.add_argument('inputs', nargs='*', help="video files or glob patterns")
+    parser.add_argument('-o', '--output', help="output directory")
+    parser.add_argument('-i', '--interval', type=float, default=1.0, help="seconds between frames (default: 1.0)")
+    parser.add_argument('-w', '--workers', type=int, default=max(1, (os.cpu_count() or 1) // 2),
+                        help="worker processes (default: half of the CPU cores)")
+    parser.add_argument('--separate-folders', action='store_true', help="write each video to its own folder")
+    parser.add_argument('--sparse-mode', choices=[SPARSE_MODE_AUTO, SPARSE_MODE_GRAB, SPARSE_MODE_SEEK],
+                        default=SPARSE_MODE_AUTO, help="how skipped frames are passed over")
+    parser.add_argument('--gpu', action='store_true', help="enable CUDA processing if available")
+    parser.add_argument('--no-resume', dest='resume', action='store_false',
+                        help="ignore the manifest in the output directory and extract everything again")
+
+    sampling = parser.add_argument_group('sampling')
+    sampling.add_argument('--sampling', choices=SAMPLING_MODES, default=SAMPLING_MODES[0],
+                          help="save every interval, the sharpest frame of each interval, "
+                               "or only when the scene changes")
+    sampling.add_argument('--scene-threshold', type=float, default=DEFAULT_SAMPLING_OPTIONS['scene_threshold'],
+                          help="difference (0-1) from the last saved frame that counts as a new scene")
+    sampling.add_argument('--scene-min-gap', type=float, default=DEFAULT_SAMPLING_OPTIONS['scene_min_gap'],
+                          help="minimum seconds between saved frames in scene mode")
+    sampling.add_argument('--scene-max-gap', type=float, default=DEFAULT_SAMPLING_OPTIONS['scene_max_gap'],
+                          help="save at least every this many seconds in scene mode (0 disables)")
+
+    filters = parser.add_argument_group('filters')
+    filters.add_argument('--min-sharpness', type=float,
+                         help="skip frames whose Laplacian variance is below this value")
+    filters.add_argument('--brightness', type=float, nargs=2, metavar=('MIN', 'MAX'),
+                         help="skip frames whose mean brightness (0-255) is outside this range")
+    filters.add_argument('--dedup', action='store_true',
+                         help="skip frames whose perceptual hash is close to an already saved frame "
+                              "(runs in a single process, ignoring --workers, so the result is repeatable)")
+    filters.add_argument('--dedup-threshold', type=int, default=DEFAULT_FILTER_OPTIONS['dedup_threshold'],
+                         help="maximum Hamming distance (out of 64 bits) treated as a duplicate")
+
+    encoder = parser.add_argument_group('output format')
+    encoder.add_argument('--format', choices=IMAGE_FORMATS, default='jpg')
+    encoder.add_argument('--quality', type=int, help="JPEG/WebP quality (1-100)")
+    encoder.add_argument('--progressive', action='store_true', help="progressive JPEG")
+    encoder.add_argument('--optimize', action='store_true', help="optimized JPEG Huffman tables")
+    encoder.add_argument('--png-compression', type=int, choices=range(10), metavar='0-9')
+    encoder.add_argument('--lossless', action='store_true', help="lossless WebP")
+
+    transform = parser.add_argument_group('crop and resize')
+    transform.add_argument('--crop', type=parse_crop, help="region of interest as x,y,w,h")
+    resize = transform.add_mutually_exclusive_group()
+    resize.add_argument('--max-side', type=int, help="downscale so the longest side is at most this many pixels")
+    resize.add_argument('--size', type=parse_size, help="fixed output size WxH (0 keeps the aspect ratio)")
+    transform.add_argument('--interpolation', choices=list(INTERPOLATIONS), default='area')
+
+    parser.add_argument('--json', action='store_true', help="print progress as JSON lines on stdout")
+    parser.add_argument('--benchmark-formats', metavar='VIDEO',
+                        help="print encode time and size per frame for each format, then exit")
+    return parser
+
+
+def options_from_args(args):
+    overrides = {
+        'output_folder': args.output,
+        'interval': args.interval,
+        'use_gpu': args.gpu and check_gpu_availability(),
+        'separate_folders': args.separate_folders,
+        'resume': args.resume,
+        'sparse_mode': args.sparse_mode,
+        'sampling_mode': args.sampling,
+        'scene_threshold': args.scene_threshold,
+        'scene_min_gap': args.scene_min_gap,
+        'scene_max_gap': args.scene_max_gap,
+        'dedup': args.dedup,
+        'dedup_threshold': args.dedup_threshold,
+        'image_format': args.format,
+        'jpeg_progressive': args.progressive,
+        'jpeg_optimize': args.optimize,
+        'webp_lossless': args.lossless,
+        'crop': args.crop,
+        'interpolation': args.interpolation,
+    }
+    if args.min_sharpness is not None:
+        overrides.update(blur_filter=True, min_sharpness=args.min_sharpness)
+    if args.brightness:
+        overrides.update(exposure_filter=True, min_brightness=args.brightness[0], max_brightness=args.brightness[1])
+    if args.quality is not None:
+        overrides['jpeg_quality'] = overrides['webp_quality'] = args.quality
+    if args.png_compression is not None:
+        overrides['png_compression'] = args.png_compression
+    if args.max_side:
+        overrides.update(resize_mode='max_side', max_side=args.max_side)
+    elif args.size:
+        overrides.update(resize_mode='fixed', resize_width=args.size[0], resize_height=args.size[1])
+    return make_options(**overrides)
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.benchmark_formats:
+        print_encoder_benchmark(args.benchmark_formats)
+        return 0
+
+    video_paths = expand_inputs(args.inputs)
+    if not video_paths:
+        parser.error("no video files matched")
+    if not args.output:
+        parser.error("--output is required")
+    os.makedirs(args.output, exist_ok=True)
+    options = options_from_args(args)
+
+    counts = {'frame': 0, 'error': 0}
+
+    def report(kind, payload):
+        if kind in counts:
+            counts[kind] += 1
+        if args.json:
+            if kind == 'progress':
+                event = dict(payload, event='progress')
+            else:
+                event = {'event': kind, {'frame': 'path', 'error': 'message'}.get(kind, 'value'): payload}
+            print(json.dumps(event, ensure_ascii=False), flush=True)
+        elif kind == 'error':
+            print(payload, file=sys.stderr)
+
+    started = time.perf_counter()
+    engine = ExtractionEngine(args.workers)
+    engine.submit(video_paths, options)
+    try:
+        # 回报都在主线程中按顺序输出，各行不会交错
+        for kind, payload in engine.results():
+            report(kind, payload)
+    except KeyboardInterrupt:
+        engine.cancel()
+        engine.join()  # 等正在运行的任务写入断点
+        return 130
+    elapsed = time.perf_counter() - started
+
+    if args.json:
+        print(json.dumps({'event': 'finished', 'frames': counts['frame'], 'errors': counts['error'],
+                          'videos': len(video_paths), 'elapsed': round(elapsed, 3)}), flush=True)
+    else:
+        print(f"Extracted {counts['frame']} frames from {len(video_paths)} videos in {elapsed:.1f}s"
+              f" ({counts['error']} errors)")
+    return 1 if counts['error'] else 0
+
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,1667 @@
+"""视频帧提取核心：不依赖 Qt，图形界面和命令行共用同一套提取流程"""
+import os
+import time
+import queue
+import signal
+import threading
+import multiprocessing
+import concurrent.futures
+import io
+import itertools
+import collections
+import csv
+import hashlib
+import json
+
+
+class _LazyModule:
+    """第一次访问属性时才执行导入，让界面不必等 OpenCV 加载完就能显示"""
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._module = None
+
+    def __getattr__(self, name):
+        if self._module is None:
+            self._module = self._loader()
+        return getattr(self._module, name)
+
+
+def _import_cv2():
+    import cv2  # 保留字面上的 import，PyInstaller 才能分析到依赖
+    return cv2
+
+
+def _import_numpy():
+    import numpy
+    return numpy
+
+
+cv2 = _LazyModule(_import_cv2)
+np = _LazyModule(_import_numpy)
+
+_gpu_available = None
+
+
+def check_gpu_availability():
+    """检查GPU是否可用，结果在进程内缓存"""
+    global _gpu_available
+    if _gpu_available is None:
+        try:
+            cuda_devices = cv2.cuda.getCudaEnabledDeviceCount()
+            _gpu_available = cuda_devices > 0
+        except:
+            _gpu_available = False
+    return _gpu_available
+
+
+def warm_up():
+    """预先导入 OpenCV 并探测 GPU，返回 (是否有GPU, [(阶段, 秒)])"""
+    timings = []
+    started = time.perf_counter()
+    cv2.setNumThreads  # 访问任意属性即触发导入
+    np.ndarray
+    timings.append(('import cv2 + numpy', time.perf_counter() - started))
+
+    started = time.perf_counter()
+    has_gpu = check_gpu_availability()
+    timings.append(('CUDA probe', time.perf_counter() - started))
+    return has_gpu, timings
+
+# 稀疏提取模式：grab 逐帧跳过，seek 直接定位，auto 根据间隔长度与实测开销自动选择
+SPARSE_MODE_AUTO = 'auto'
+SPARSE_MODE_GRAB = 'grab'
+SPARSE_MODE_SEEK = 'seek'
+
+# 间隔短于该帧数时不尝试 seek，回退到关键帧再解码通常比直接 grab 更慢
+SEEK_MIN_INTERVAL_FRAMES = 48
+
+
+def iter_sparse_frames(cap, interval_frames, total_frames=0, mode=SPARSE_MODE_AUTO, should_stop=None,
+                       start_frame=0, end_frame=None, skip_step=0, wait_if_paused=None):
+    """按帧间隔稀疏读取视频，依次产出 (帧序号, 帧)
+
+    被跳过的帧只调用 cap.grab()，不做颜色转换和拷贝；间隔较长时改用
+    CAP_PROP_POS_FRAMES 定位，由后端从最近的关键帧开始解码到目标帧。
+    auto 模式先用 grab 走完第一个间隔并计时，再试探一次 seek，之后固定使用较快的一种。
+    只读取 [start_frame, end_frame) 内的帧，帧序号始终是 interval_frames 的整数倍，
+    因此分段读取的结果与从头顺序读取一致。skip_step 大于 0 时，序号是它整数倍的采样点
+    已经提取过，不再读取。
+    should_stop 和 wait_if_paused 在每次 grab 前检查，间隔很长时暂停也能立刻生效。
+    """
+    interval_frames = max(1, int(interval_frames))
+    if mode != SPARSE_MODE_GRAB and (total_frames <= 0 or
+                                     (mode == SPARSE_MODE_AUTO and interval_frames < SEEK_MIN_INTERVAL_FRAMES)):
+        mode = SPARSE_MODE_GRAB
+
+    position = 0  # 下一次 grab/read 得到的帧序号
+    target = -(-start_frame // interval_frames) * interval_frames  # 不小于 start_frame 的第一个采样点
+    if target > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+        position = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+        if position > target:
+            # 定位越过了目标，只能从头逐帧 grab
+            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            position = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+    grab_cost = None  # auto 模式下实测的单帧 grab 耗时
+    read_cost = None
+    while True:
+        if wait_if_paused is not None:
+            wait_if_paused()
+        if should_stop is not None and should_stop():
+            return
+        while skip_step and target % skip_step == 0:
+            target += interval_frames
+        if end_frame is not None and target >= end_frame:
+            return
+
+        use_seek = mode == SPARSE_MODE_SEEK or (mode == SPARSE_MODE_AUTO and grab_cost is not None)
+        started = time.perf_counter()
+        if use_seek and target != position:
+            if target >= total_frames:
+                return
+            cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+            position = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+            if position != target:
+                # 后端无法精确定位，之后一律逐帧 grab
+                mode = SPARSE_MODE_GRAB
+                if position > target:
+                    # 越过了目标时不能产出采样点以外的帧，与开头一样从头逐帧 grab
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    position = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+
+        skipped = 0
+        while position < target:
+            if wait_if_paused is not None:
+                wait_if_paused()
+            if should_stop is not None and should_stop():
+                return
+            if not cap.grab():
+                return
+            position += 1
+            skipped += 1
+
+        grabbed = time.perf_counter()
+        ret, frame = cap.read()
+        if not ret:
+            return
+        frame_index = position
+        position += 1
+
+        if mode == SPARSE_MODE_AUTO:
+            if grab_cost is None:
+                if skipped:
+                    grab_cost = (grabbed - started) / skipped
+                    read_cost = time.perf_counter() - grabbed
+            else:
+                seek_cost = time.perf_counter() - started
+                grab_path_cost = grab_cost * (interval_frames - 1) + read_cost
+                mode = SPARSE_MODE_SEEK if seek_cost < grab_path_cost else SPARSE_MODE_GRAB
+
+        yield frame_index, frame
+
+        target += interval_frames
+        while target <= frame_index:
+            target += interval_frames
+
+
+def seek_to_frame(cap, target):
+    """把读取位置移到 target，后端无法精确定位时从头逐帧 grab；视频不够长时返回 False"""
+    if target <= 0:
+        return True
+    cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+    position = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+    if position > target:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        position = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+    while position < target:
+        if not cap.grab():
+            return False
+        position += 1
+    return True
+
+
+# 采样方式：interval 按固定时间间隔，best 取每个间隔内最清晰的一帧，scene 在画面变化时保存
+SAMPLING_MODE_INTERVAL = 'interval'
+SAMPLING_MODE_BEST = 'best'
+SAMPLING_MODE_SCENE = 'scene'
+SAMPLING_MODES = [SAMPLING_MODE_INTERVAL, SAMPLING_MODE_BEST, SAMPLING_MODE_SCENE]
+
+DEFAULT_SAMPLING_OPTIONS = {
+    'sampling_mode': SAMPLING_MODE_INTERVAL,
+    'scene_threshold': 0.3,  # 0~1，与上一张保存帧的差异达到该值时保存
+    'scene_min_gap': 0.5,  # 秒，两张保存帧之间的最短间隔
+    'scene_max_gap': 10.0,  # 秒，画面一直不变时也至少隔这么久保存一张，0 表示不限制
+}
+
+# 场景比较用的灰度小图尺寸和直方图分箱数
+SCENE_SIGNATURE_SIZE = (64, 36)
+SCENE_HISTOGRAM_BINS = 32
+# 场景模式逐帧解码但只回报保存的帧，每隔这么多帧额外回报一次解码位置
+SCENE_PROGRESS_FRAMES = 30
+
+
+def scene_signature(frame):
+    """把帧缩小为灰度小图并统计直方图，作为场景比较的特征"""
+    small = cv2.resize(frame, SCENE_SIGNATURE_SIZE, interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    histogram = np.bincount((gray >> 3).ravel(), minlength=SCENE_HISTOGRAM_BINS) / gray.size
+    return gray.astype(np.int16), histogram
+
+
+def scene_score(signature, other):
+    """两帧特征的差异，0 表示相同，1 表示完全不同
+
+    直方图距离对切镜和明暗变化敏感，像素差对色调不变的运动、平移敏感，取两者较大值。
+    """
+    histogram_distance = 0.5 * np.abs(signature[1] - other[1]).sum()
+    pixel_distance = np.abs(signature[0] - other[0]).mean() / 255.0
+    return max(histogram_distance, pixel_distance)
+
+
+def iter_scene_frames(cap, fps, options, should_stop=None, on_position=None, start_frame=0, wait_if_paused=None):
+    """逐帧解码，产出与上一张保存帧差异超过阈值的 (帧序号, 帧)
+
+    第一帧总是保存。距上一张保存帧不足 scene_min_gap 秒的帧只 grab 不解码；
+    超过 scene_max_gap 秒画面仍未变化时强制保存一张，保证覆盖。
+    start_frame 大于 0 时表示续传：该帧是上次最后产出的帧，只作为比较基准，不再产出，
+    因此续传结果与一次提取完相同。
+    on_position(帧序号) 每 SCENE_PROGRESS_FRAMES 帧调用一次，用于回报进度。
+    暂停和停止在每一帧前检查，不必等到下一次产出。
+    """
+    min_gap = max(1, round(fps * options['scene_min_gap']))
+    max_gap = max(min_gap, round(fps * options['scene_max_gap'])) if options['scene_max_gap'] > 0 else 0
+    threshold = options['scene_threshold']
+
+    if not seek_to_frame(cap, start_frame):
+        return
+    last_index = None
+    last_signature = None
+    frame_index = start_frame
+    if start_frame > 0:
+        ret, frame = cap.read()
+        if not ret:
+            return
+        last_index, last_signature = start_frame, scene_signature(frame)
+        frame_index += 1
+    while True:
+        if wait_if_paused is not None:
+            wait_if_paused()
+        if should_stop is not None and should_stop():
+            return
+        if on_position is not None and frame_index > start_frame and frame_index % SCENE_PROGRESS_FRAMES == 0:
+            on_position(frame_index - 1)
+
+        if last_index is not None and frame_index - last_index < min_gap:
+            if not cap.grab():
+                return
+            frame_index += 1
+            continue
+
+        ret, frame = cap.read()
+        if not ret:
+            return
+        signature = scene_signature(frame)
+        if (last_signature is None
+                or (max_gap and frame_index - last_index >= max_gap)
+                or scene_score(signature, last_signature) >= threshold):
+            last_index, last_signature = frame_index, signature
+            yield frame_index, frame
+        frame_index += 1
+
+
+# 清晰度和亮度在缩小到该最长边的灰度图上计算，不同分辨率的视频得分可以直接比较
+QUALITY_MAX_SIDE = 320
+
+
+def frame_quality(frame):
+    """返回 (清晰度, 平均亮度)，清晰度为拉普拉斯响应的方差，越模糊越小"""
+    height, width = frame.shape[:2]
+    scale = QUALITY_MAX_SIDE / max(height, width)
+    if scale < 1:
+        frame = cv2.resize(frame, (max(1, round(width * scale)), max(1, round(height * scale))),
+                           interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var()), float(gray.mean())
+
+
+def iter_best_frames(cap, interval_frames, should_stop=None, start_frame=0, end_frame=None, wait_if_paused=None):
+    """逐帧解码，每个间隔窗口只产出其中最清晰的一帧 (帧序号, 帧, frame_quality 的结果)
+
+    窗口为 [k * interval_frames, (k + 1) * interval_frames)，与固定间隔的采样点对齐，
+    因此文件编号和分段方式都不变。窗口内只保留当前最清晰的一帧，内存占用与间隔长度无关。
+    暂停和停止在每一帧前检查，不必等整个窗口解码完。
+    """
+    interval_frames = max(1, int(interval_frames))
+    position = -(-start_frame // interval_frames) * interval_frames
+    if not seek_to_frame(cap, position):
+        return
+
+    best = None  # ((清晰度, 亮度), 帧序号, 帧)
+    while True:
+        if wait_if_paused is not None:
+            wait_if_paused()
+        if should_stop is not None and should_stop():
+            return
+        if end_frame is not None and position >= end_frame:
+            break
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if best is not None and position // interval_frames != best[1] // interval_frames:
+            yield best[1], best[2], best[0]
+            best = None
+        quality = frame_quality(frame)
+        if best is None or quality[0] > best[0][0]:
+            best = (quality, position, frame)
+        position += 1
+    if best is not None:
+        yield best[1], best[2], best[0]
+
+
+# 编码前的缩放方式：不缩放、限制最长边、固定尺寸
+RESIZE_MODES = ['none', 'max_side', 'fixed']
+
+# 插值方式到 cv2 常量名的映射，使用时再取值，避免导入本模块时就加载 OpenCV
+INTERPOLATIONS = {
+    'area': 'INTER_AREA',
+    'linear': 'INTER_LINEAR',
+    'cubic': 'INTER_CUBIC',
+    'nearest': 'INTER_NEAREST',
+}
+
+DEFAULT_TRANSFORM_OPTIONS = {
+    'crop': None,  # (x, y, w, h)，以原始帧的像素为单位
+    'resize_mode': 'none',
+    'max_side': 640,
+    'resize_width': 640,
+    'resize_height': 0,  # 固定尺寸时宽或高为 0 表示按比例计算
+    'interpolation': 'area',
+}
+
+
+def parse_crop(text):
+    """把 'x,y,w,h' 解析为裁剪区域，空字符串表示不裁剪"""
+    text = text.strip()
+    if not text:
+        return None
+    values = [int(value) for value in text.replace('，', ',').split(',')]
+    if len(values) != 4 or values[0] < 0 or values[1] < 0 or values[2] <= 0 or values[3] <= 0:
+        raise ValueError(f"Invalid crop region: {text}")
+    return tuple(values)
+
+
+def target_size(width, height, options):
+    """计算缩放后的 (宽, 高)，不需要缩放时返回 None"""
+    resize_mode = options.get('resize_mode', 'none')
+    if resize_mode == 'max_side':
+        scale = options['max_side'] / max(width, height)
+        if scale >= 1:
+            return None  # 只缩小不放大
+        return max(1, round(width * scale)), max(1, round(height * scale))
+    if resize_mode == 'fixed':
+        new_width, new_height = options['resize_width'], options['resize_height']
+        if new_width <= 0 and new_height <= 0:
+            return None
+        if new_width <= 0:
+            new_width = max(1, round(width * new_height / height))
+        elif new_height <= 0:
+            new_height = max(1, round(height * new_width / width))
+        if (new_width, new_height) == (width, height):
+            return None
+        return new_width, new_height
+    return None
+
+
+def transform_frame(frame, options):
+    """编码前裁剪 ROI 并缩放，减少后续编码和写盘的数据量"""
+    crop = options.get('crop')
+    if crop:
+        x, y, w, h = crop
+        frame = frame[y:y + h, x:x + w]
+        if frame.size == 0:
+            raise ValueError(f"Crop region {crop} is outside the frame")
+    size = target_size(frame.shape[1], frame.shape[0], options)
+    if size is not None:
+        # 缩小时 INTER_AREA 质量最好，且输出更小，编码也更快
+        interpolation = getattr(cv2, INTERPOLATIONS[options.get('interpolation', 'area')])
+        return cv2.resize(frame, size, interpolation=interpolation)
+    # 裁剪得到的是原帧的视图，复制一份，避免写盘队列持有整帧
+    return np.ascontiguousarray(frame)
+
+
+def process_frame_gpu(frame, report):
+    """使用GPU处理帧"""
+    try:
+        # 将CPU图像数据传输到GPU
+        gpu_frame = cv2.cuda_GpuMat()
+        gpu_frame.upload(frame)
+
+        # 示例：使用高斯模糊处理
+        gpu_blurred = cv2.cuda.GaussianBlur(gpu_frame, (5, 5), 0)
+
+        # 将处理后的图像从GPU传回CPU
+        result = gpu_blurred.download()
+        return result
+    except cv2.error as e:
+        report('error', f"GPU处理出错: {str(e)}")
+        return frame  # 出错时返回原始帧
+
+
+DEFAULT_FILTER_OPTIONS = {
+    'blur_filter': False,  # 跳过清晰度低于 min_sharpness 的帧
+    'min_sharpness': 100.0,
+    'exposure_filter': False,  # 跳过平均亮度不在 [min_brightness, max_brightness] 内的帧
+    'min_brightness': 20.0,
+    'max_brightness': 235.0,
+    'dedup': False,  # 跳过与已保存帧近似重复的帧
+    'dedup_threshold': 6,  # 64 位 dHash 的汉明距离，不超过该值视为重复
+}
+
+
+def quality_rejection(frame, options, quality=None):
+    """按清晰度和曝光检查帧，不合格时返回原因，否则返回 None；quality 为已经算好的 frame_quality 结果"""
+    if not (options['blur_filter'] or options['exposure_filter']):
+        return None
+    sharpness, brightness = quality or frame_quality(frame)
+    if options['blur_filter'] and sharpness < options['min_sharpness']:
+        return 'blurry'
+    if options['exposure_filter'] and not options['min_brightness'] <= brightness <= options['max_brightness']:
+        return 'exposure'
+    return None
+
+
+def dhash(frame):
+    """64 位差异哈希：缩成 9x8 灰度图，比较每行相邻像素的明暗"""
+    small = cv2.resize(frame, (9, 8), interpolation=cv2.INTER_AREA)
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count('1')
+
+
+class MultiIndexHash:
+    """64 位哈希的多索引哈希表，按汉明距离查找近邻
+
+    把哈希切成 4 段 16 位分别建表。两个哈希距离不超过 t 时，至少有一段的距离
+    不超过 t // 4（抽屉原理），因此只需在每张表里查找该半径内的段值，再逐一核对候选，
+    不必遍历全部哈希。几十万个哈希时单次查询仍在毫秒以内。
+    """
+
+    CHUNKS = 4
+    CHUNK_BITS = 16
+
+    def __init__(self):
+        self.tables = [collections.defaultdict(list) for _ in range(self.CHUNKS)]
+        self.size = 0
+        self.masks = {}  # 半径 -> 该半径内的全部翻转掩码
+
+    def chunks(self, value):
+        mask = (1 << self.CHUNK_BITS) - 1
+        return [(value >> (i * self.CHUNK_BITS)) & mask for i in range(self.CHUNKS)]
+
+    def flip_masks(self, radius):
+        if radius not in self.masks:
+            masks = [0]
+            for bits in range(1, radius + 1):
+                for positions in itertools.combinations(range(self.CHUNK_BITS), bits):
+                    masks.append(sum(1 << position for position in positions))
+            self.masks[radius] = masks
+        return self.masks[radius]
+
+    def add(self, value):
+        for table, chunk in zip(self.tables, self.chunks(value)):
+            table[chunk].append(value)
+        self.size += 1
+
+    def contains_within(self, value, threshold):
+        """是否存在与 value 的距离不超过 threshold 的哈希"""
+        masks = self.flip_masks(threshold // self.CHUNKS)
+        for table, chunk in zip(self.tables, self.chunks(value)):
+            for mask in masks:
+                for candidate in table.get(chunk ^ mask, ()):
+                    if hamming_distance(value, candidate) <= threshold:
+                        return True
+        return False
+
+
+class DuplicateFilter:
+    """记录已保存帧的哈希，判断新帧是否与其中之一近似重复"""
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.index = MultiIndexHash()
+
+    def add(self, value):
+        """登记一个已保存帧的哈希，用于续传时恢复之前的索引"""
+        self.index.add(value)
+
+    def is_duplicate(self, frame, value=None):
+        """重复时返回 True；否则登记该帧并返回 False。value 为已经算好的 dhash"""
+        if value is None:
+            value = dhash(frame)
+        if self.index.contains_within(value, self.threshold):
+            return True
+        self.index.add(value)
+        return False
+
+
+def interval_to_frames(fps, interval):
+    """把以秒为单位的提取间隔换算为帧数"""
+    return max(1, int(fps * interval))
+
+
+def probe_video(video_path):
+    """读取视频的总帧数和帧率，打不开时返回 (0, 0)
+
+    容器没有帧数信息时，定位到末尾读取时长，再按帧率估算帧数。
+    """
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if not cap.isOpened():
+            return 0, 0
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        if total_frames <= 0 and fps > 0 and cap.set(cv2.CAP_PROP_POS_AVI_RATIO, 1):
+            total_frames = int(cap.get(cv2.CAP_PROP_POS_MSEC) / 1000 * fps)
+        return max(total_frames, 0), fps
+    finally:
+        cap.release()
+
+
+def probe_videos(video_paths):
+    return {video_path: probe_video(video_path) for video_path in video_paths}
+
+
+# 单个分段至少包含的帧数，太短的分段打开视频和定位的开销会超过并行收益
+MIN_SEGMENT_FRAMES = 3000
+
+
+def range_length(start_frame, end_frame, total_frames):
+    """帧区间 [start_frame, end_frame) 的帧数，end_frame 为 None 表示到视频结尾"""
+    return max(0, (total_frames if end_frame is None else end_frame) - start_frame)
+
+
+def plan_extraction_tasks(video_paths, interval, workers, probes=None, ranges=None):
+    """把视频拆分为 (video_path, start_frame, end_frame) 任务，按工作量从大到小排序
+
+    每个进程的平均工作量作为分段长度，长视频被切成多段交给不同进程，
+    短视频保持整段。分段边界对齐到采样点，最后一段的 end_frame 为 None，
+    以免帧数元数据偏小时漏掉结尾。
+    ranges 给出每个视频还需要处理的帧区间（续传时使用），默认整段处理。
+    """
+    probes = probes or probe_videos(video_paths)
+    ranges = ranges or {}
+    video_ranges = {video_path: ranges.get(video_path, [(0, None)]) for video_path in video_paths}
+    total = sum(
+        range_length(start, end, probes[video_path][0])
+        for video_path in video_paths if probes[video_path][1] > 0
+        for start, end in video_ranges[video_path]
+    )
+    segment_frames = max(MIN_SEGMENT_FRAMES, -(-total // max(1, workers)))
+
+    tasks = []
+    for video_path in video_paths:
+        total_frames, fps = probes[video_path]
+        for range_start, range_end in video_ranges[video_path]:
+            length = range_length(range_start, range_end, total_frames)
+            if fps <= 0 or length <= segment_frames:
+                # 无法拆分的视频交给 extract_video 自己报告错误或整段处理
+                tasks.append((max(length, 1), video_path, range_start, range_end))
+                continue
+            interval_frames = interval_to_frames(fps, interval)
+            step = -(-segment_frames // interval_frames) * interval_frames
+            stop = range_start + length
+            # 续传区间可能从窗口中间开始，分段边界仍从采样点算起，best 模式的窗口不会被切开
+            aligned_start = range_start // interval_frames * interval_frames
+            for start in range(aligned_start, stop, step):
+                end = start + step if start + step < stop else range_end
+                start = max(start, range_start)
+                tasks.append((min(step, stop - start), video_path, start, end))
+
+    tasks.sort(key=lambda task: task[0], reverse=True)
+    return [task[1:] for task in tasks]
+
+
+# 支持的输出格式，npy 直接保存原始数组，不经过图像编码
+IMAGE_FORMATS = ['jpg', 'png', 'webp', 'npy']
+
+DEFAULT_ENCODER_OPTIONS = {
+    'image_format': 'jpg',
+    'jpeg_quality': 95,
+    'jpeg_progressive': False,
+    'jpeg_optimize': False,
+    'png_compression': 3,
+    'webp_quality': 90,
+    'webp_lossless': False,
+}
+
+
+def encoder_settings(options):
+    """根据提取选项返回 (扩展名, cv2.imencode 参数)"""
+    settings = dict(DEFAULT_ENCODER_OPTIONS, **options)
+    image_format = settings['image_format']
+    if image_format == 'jpg':
+        return '.jpg', [
+            cv2.IMWRITE_JPEG_QUALITY, int(settings['jpeg_quality']),
+            cv2.IMWRITE_JPEG_PROGRESSIVE, int(bool(settings['jpeg_progressive'])),
+            cv2.IMWRITE_JPEG_OPTIMIZE, int(bool(settings['jpeg_optimize'])),
+        ]
+    if image_format == 'png':
+        return '.png', [cv2.IMWRITE_PNG_COMPRESSION, int(settings['png_compression'])]
+    if image_format == 'webp':
+        # OpenCV 中 WebP 质量大于 100 表示无损
+        quality = 101 if settings['webp_lossless'] else int(settings['webp_quality'])
+        return '.webp', [cv2.IMWRITE_WEBP_QUALITY, quality]
+    if image_format == 'npy':
+        return '.npy', []
+    raise ValueError(f"Unsupported image format: {image_format}")
+
+
+def encode_frame(frame, extension, params):
+    """把帧编码为文件内容"""
+    if extension == '.npy':
+        buffer = io.BytesIO()
+        np.save(buffer, frame)
+        return buffer.getvalue()
+    ok, buffer = cv2.imencode(extension, frame, params)
+    if not ok:
+        raise ValueError("encoding failed")
+    return buffer.tobytes()
+
+
+# 基准测试中比较的编码设置
+BENCHMARK_ENCODERS = [
+    ('jpg q95', {'image_format': 'jpg', 'jpeg_quality': 95}),
+    ('jpg q80', {'image_format': 'jpg', 'jpeg_quality': 80}),
+    ('jpg q95 progressive+optimize', {'image_format': 'jpg', 'jpeg_quality': 95,
+                                      'jpeg_progressive': True, 'jpeg_optimize': True}),
+    ('png level 1', {'image_format': 'png', 'png_compression': 1}),
+    ('png level 3', {'image_format': 'png', 'png_compression': 3}),
+    ('png level 9', {'image_format': 'png', 'png_compression': 9}),
+    ('webp q80', {'image_format': 'webp', 'webp_quality': 80}),
+    ('webp lossless', {'image_format': 'webp', 'webp_lossless': True}),
+    ('npy', {'image_format': 'npy'}),
+]
+
+
+def benchmark_encoders(video_path, samples=20):
+    """在示例视频上比较各编码设置，返回 [(名称, 每帧编码毫秒, 每帧字节数)]"""
+    cap = cv2.VideoCapture(video_path)
+    try:
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        interval_frames = max(1, total_frames // samples) if total_frames > 0 else 1
+        frames = [frame for _, frame in iter_sparse_frames(cap, interval_frames, total_frames)][:samples]
+    finally:
+        cap.release()
+    if not frames:
+        raise ValueError(f"Could not read frames from {video_path}")
+
+    results = []
+    for name, options in BENCHMARK_ENCODERS:
+        extension, params = encoder_settings(options)
+        started = time.perf_counter()
+        total_bytes = sum(len(encode_frame(frame, extension, params)) for frame in frames)
+        elapsed = time.perf_counter() - started
+        results.append((name, elapsed * 1000 / len(frames), total_bytes / len(frames)))
+    return results
+
+
+def print_encoder_benchmark(video_path):
+    print(f"{'encoder':<32}{'ms/frame':>10}{'KB/frame':>12}")
+    for name, ms_per_frame, bytes_per_frame in benchmark_encoders(video_path):
+        print(f"{name:<32}{ms_per_frame:>10.2f}{bytes_per_frame / 1024:>12.1f}")
+
+
+def make_thumbnail(frame, size):
+    """按比例缩小到不超过 size x size 的 BGR 缩略图"""
+    height, width = frame.shape[:2]
+    scale = min(size / width, size / height)
+    if scale >= 1:
+        return np.ascontiguousarray(frame)
+    return cv2.resize(frame, (max(1, round(width * scale)), max(1, round(height * scale))),
+                      interpolation=cv2.INTER_AREA)
+
+
+class FrameWriter:
+    """解码与编码写盘分离的流水线
+
+    解码线程通过 submit() 把帧放入有界队列，队列满时阻塞以限制内存占用；
+    若干编码线程（cv2 编码时会释放 GIL）负责编码并写盘，文件完整落盘后
+    才回报 'written'（字节数）和 'frame'，写入失败时回报 'error' 和 'failed'（路径）。
+    submit() 带有帧索引行时，补上字节数后先回报 'record'。thumbnail_size 大于 0 时
+    还会直接用内存中的帧生成预览缩略图并先回报 'thumbnail'，界面不必再从磁盘读取解码。
+    """
+
+    def __init__(self, report, extension='.jpg', params=None, threads=2, queue_size=None, thumbnail_size=0):
+        self.report = report
+        self.extension = extension
+        self.params = params or []
+        self.thumbnail_size = thumbnail_size
+        self.queue = queue.Queue(maxsize=queue_size or threads * 2)
+        self.threads = [
+            threading.Thread(target=self._encode_loop, daemon=True)
+            for _ in range(max(1, threads))
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, output_path, frame, record=None):
+        self.queue.put((output_path, frame, record))
+
+    def close(self):
+        """等待队列中的帧全部写完"""
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+
+    def _encode_loop(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            output_path, frame, record = item
+            try:
+                data = encode_frame(frame, self.extension, self.params)
+                self.write(output_path, data)
+            except Exception as e:
+                self.report('error', f"Could not write {output_path}: {str(e)}")
+                self.report('failed', output_path)
+                continue
+            if self.thumbnail_size:
+                self.report('thumbnail', (output_path, make_thumbnail(frame, self.thumbnail_size)))
+            if record is not None:
+                self.report('record', (record[0], dict(record[1], bytes=len(data))))
+            self.report('written', len(data))
+            self.report('frame', output_path)
+
+    @staticmethod
+    def write(output_path, data):
+        # 先写临时文件再改名，其他程序看到的文件总是完整的；
+        # imencode + open 也能处理 cv2.imwrite 不支持的非 ASCII 路径。
+        # 改名前 fsync，断电后断点记录中标为完成的帧不会是空文件或截断的文件
+        temp_path = output_path + '.part'
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, output_path)
+
+
+def output_folder_for(video_path, options):
+    video_name = os.path.splitext(os.path.basename(video_path))[0]
+    if options['separate_folders']:
+        return os.path.join(options['output_folder'], video_name)
+    return options['output_folder']
+
+
+def extract_video(video_path, options, report, should_stop=None, wait_if_paused=None,
+                  start_frame=0, end_frame=None, duplicate_filter=None):
+    """提取单个视频的帧
+
+    不依赖 Qt，线程内与子进程中共用。解码位置、新帧和错误都通过 report(kind, payload)
+    回报，kind 为 'position' / 'written' / 'skipped' / 'frame' / 'thumbnail' / 'record' / 'error' /
+    'checkpoint'，其中 'position'、'written' 和 'skipped' 由 run_extraction 汇总为 'progress'，
+    'record' (video_path, 帧索引行) 由 run_extraction 写入 FrameIndex。
+    指定 start_frame / end_frame 时只处理这一段，文件编号与整段提取时相同。
+    duplicate_filter 可在多个视频之间共用，以便跨视频去重。
+
+    每隔 CHECKPOINT_INTERVAL 秒以及结束时回报一次
+    'checkpoint' (video_path, start_frame, next_frame, 新写完的文件名)，
+    表示 [start_frame, next_frame) 内的帧都已落盘，续传时从 next_frame 开始。
+    有帧写入失败时断点停在第一张失败的帧，结束时回报 'incomplete' (video_path, start_frame)，
+    该任务不算完成，下次从失败处重新提取。
+    """
+    video_name = os.path.splitext(os.path.basename(video_path))[0]
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if not cap.isOpened():
+            report('error', f"Could not open video: {video_path}")
+            return
+
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        if fps <= 0:
+            report('error', f"Invalid FPS for video: {video_path}")
+            return
+
+        interval_frames = interval_to_frames(fps, options['interval'])
+
+        video_output_folder = output_folder_for(video_path, options)
+        os.makedirs(video_output_folder, exist_ok=True)
+
+        scene_mode = options['sampling_mode'] == SAMPLING_MODE_SCENE
+        if scene_mode:
+            # 场景模式依赖上一张保存帧，不分段
+            frames = iter_scene_frames(
+                cap, fps, options, should_stop=should_stop, start_frame=start_frame, wait_if_paused=wait_if_paused,
+                on_position=lambda frame_index: report('position', (video_path, start_frame, frame_index))
+            )
+        elif options['sampling_mode'] == SAMPLING_MODE_BEST:
+            frames = iter_best_frames(
+                cap, interval_frames, should_stop=should_stop, start_frame=start_frame, end_frame=end_frame,
+                wait_if_paused=wait_if_paused
+            )
+        else:
+            frames = iter_sparse_frames(
+                cap, interval_frames, total_frames, options['sparse_mode'], should_stop=should_stop,
+                start_frame=start_frame, end_frame=end_frame, skip_step=options['reuse_step'],
+                wait_if_paused=wait_if_paused
+            )
+        if options['sampling_mode'] != SAMPLING_MODE_BEST:
+            # 只有 best 模式选帧时已经算过清晰度和亮度，其余模式统一补上 None
+            frames = ((frame_index, frame, None) for frame_index, frame in frames)
+        extension, params = encoder_settings(options)
+
+        submitted = collections.deque()  # (帧序号, 输出路径, 之前最后处理完的帧)，按提交顺序
+        written = set()  # 编码线程已写完、尚未计入断点的路径
+        failed = set()  # 写入失败的路径
+        first_failed = None  # 第一张写入失败的帧在 submitted 中的条目，断点不再越过它
+
+        def report_written(kind, payload):
+            if kind == 'failed':
+                failed.add(payload)
+                return
+            if kind == 'frame':
+                written.add(payload)
+            report(kind, payload)
+
+        def checkpoint(pending_index, last_index):
+            """pending_index 为已取出但尚未处理完的帧，last_index 为最后处理完的帧"""
+            nonlocal first_failed
+            files = []
+            while submitted and (submitted[0][1] in written or submitted[0][1] in failed):
+                entry = submitted.popleft()
+                if entry[1] in failed:
+                    first_failed = first_failed or entry
+                else:
+                    written.discard(entry[1])
+                    files.append(os.path.basename(entry[1]))
+            head = first_failed or (submitted[0] if submitted else None)
+            if scene_mode:
+                # 场景模式的断点是最后一个完成的产出帧，续传时作为比较基准
+                if head is not None:
+                    last_index = head[2]
+                next_frame = start_frame if last_index is None else last_index
+            else:
+                first_unfinished = head[0] if head is not None else pending_index
+                if first_unfinished is not None:
+                    # best 模式要从未完成帧所在窗口的开头重新挑选
+                    next_frame = first_unfinished // interval_frames * interval_frames
+                else:
+                    next_frame = start_frame if last_index is None else last_index + 1
+            report('checkpoint', (video_path, start_frame, max(next_frame, start_frame), files))
+
+        writer = FrameWriter(report_written, extension, params, threads=options['encoder_threads'],
+                             thumbnail_size=options['thumbnail_size'])
+        pending_index = last_index = None
+        last_checkpoint = time.perf_counter()
+        try:
+            for frame_index, frame, quality in frames:
+                pending_index = frame_index
+                if time.perf_counter() - last_checkpoint >= CHECKPOINT_INTERVAL:
+                    checkpoint(pending_index, last_index)
+                    last_checkpoint = time.perf_counter()
+                if wait_if_paused is not None:
+                    wait_if_paused()
+                if should_stop is not None and should_stop():  # 检查停止标志
+                    break
+
+                # 清晰度和曝光按原始帧判断，与 best 模式选帧的依据一致
+                if quality is None and (options['blur_filter'] or options['exposure_filter']):
+                    quality = frame_quality(frame)
+                frame_hash = None
+                rejection = quality_rejection(frame, options, quality)
+                if rejection is None:
+                    # 先裁剪缩放，GPU 处理和编码都只针对缩小后的图像
+                    frame = transform_frame(frame, options)
+                    if duplicate_filter is not None:
+                        frame_hash = dhash(frame)
+                        if duplicate_filter.is_duplicate(frame, frame_hash):
+                            rejection = 'duplicate'
+
+                if rejection is not None:
+                    report('skipped', rejection)
+                else:
+                    if options['use_gpu']:
+                        frame = process_frame_gpu(frame, report)  # 使用GPU处理帧
+                    if scene_mode:
+                        # 场景帧按原视频帧序号命名，续传时不需要记住已保存的张数
+                        file_name = f"{video_name}_scene_{frame_index:06d}{extension}"
+                    else:
+                        # 采样点都是 interval_frames 的整数倍，按帧序号编号，分段提取也不会错位
+                        file_name = f"{video_name}_frame_{frame_index // interval_frames:04d}{extension}"
+                    output_path = os.path.join(video_output_folder, file_name)
+                    submitted.append((frame_index, output_path, last_index))
+                    record = frame_index_row(frame_index, fps, file_name, quality, frame_hash)
+                    writer.submit(output_path, frame, (video_path, record))  # 队列满时在此等待编码线程
+                report('position', (video_path, start_frame, frame_index))
+                last_index, pending_index = frame_index, None
+        finally:
+            writer.close()
+            checkpoint(pending_index, last_index)
+            if first_failed is not None:
+                report('incomplete', (video_path, start_frame))
+    finally:
+        cap.release()
+
+
+# 提取过程中回报断点的间隔（秒），程序意外退出时最多重做这么长时间的工作
+CHECKPOINT_INTERVAL = 2.0
+
+DEFAULT_OPTIONS = dict(
+    DEFAULT_ENCODER_OPTIONS,
+    **DEFAULT_TRANSFORM_OPTIONS,
+    **DEFAULT_SAMPLING_OPTIONS,
+    **DEFAULT_FILTER_OPTIONS,
+    output_folder='',
+    interval=1.0,  # 秒
+    use_gpu=False,
+    separate_folders=False,
+    sparse_mode=SPARSE_MODE_AUTO,
+    encoder_threads=2,
+    thumbnail_size=0,  # 大于 0 时回报 'thumbnail'，供界面预览
+    resume=True,  # 按输出目录中的断点记录跳过已完成的部分
+    reuse_step=0,  # 内部使用：帧序号是该值整数倍的采样点已由上次提取写出
+)
+
+
+def make_options(**overrides):
+    """在默认提取选项的基础上覆盖指定项"""
+    unknown = set(overrides) - set(DEFAULT_OPTIONS)
+    if unknown:
+        raise ValueError(f"Unknown extraction options: {', '.join(sorted(unknown))}")
+    return dict(DEFAULT_OPTIONS, **overrides)
+
+
+class ExtractionControl:
+    """暂停、继续和停止信号
+
+    使用 spawn 上下文的 Event，同一个对象可以在线程之间和进程池的子进程中共用。
+    暂停时解码循环阻塞在 resume_event.wait() 上，继续或停止时立刻被唤醒，不需要轮询；
+    停止标志在每一帧前检查，最多再处理完当前这一帧。
+    """
+
+    def __init__(self):
+        context = multiprocessing.get_context('spawn')
+        self.stop_event = context.Event()
+        self.resume_event = context.Event()
+        self.resume_event.set()
+
+    def pause(self):
+        self.resume_event.clear()
+
+    def resume(self):
+        self.resume_event.set()
+
+    def stop(self):
+        self.stop_event.set()
+        self.resume_event.set()  # 唤醒暂停中的解码循环，让它看到停止标志
+
+    def is_paused(self):
+        return not self.resume_event.is_set()
+
+    def is_stopped(self):
+        return self.stop_event.is_set()
+
+    def wait_if_paused(self):
+        self.resume_event.wait()
+
+
+def make_duplicate_filter(options):
+    return DuplicateFilter(options['dedup_threshold']) if options['dedup'] else None
+
+
+# 子进程内的共享状态，由进程池的 initializer 设置
+_worker_messages = None
+_worker_control = None
+
+
+def _init_extraction_worker(messages, control):
+    global _worker_messages, _worker_control
+    _worker_messages = messages
+    _worker_control = control
+    # Ctrl+C 由主进程处理并通过 control 停止子进程，子进程自己退出会丢掉最后的断点
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # 异常退出时主进程不再读取队列，子进程退出不必等待队列缓冲写完
+    _worker_messages.cancel_join_thread()
+
+
+def _extract_video_task(task_id, video_path, options, start_frame, end_frame):
+    """进程池任务：把 extract_video 的回报转发到消息队列，结束时发送 done"""
+    def report(kind, payload):
+        _worker_messages.put((task_id, kind, payload))
+
+    try:
+        extract_video(video_path, options, report,
+                      should_stop=_worker_control.is_stopped,
+                      wait_if_paused=_worker_control.wait_if_paused,
+                      start_frame=start_frame, end_frame=end_frame)
+    except Exception as e:
+        report('error', f"Error processing video {video_path}: {str(e)}")
+    finally:
+        report('done', None)
+
+
+MANIFEST_NAME = '.fx_manifest.json'
+# 断点记录最多每隔这么多秒写一次盘
+MANIFEST_SAVE_INTERVAL = 2.0
+# 计算视频指纹时读取的开头、中间、结尾块大小
+FINGERPRINT_CHUNK = 1 << 20
+# 不影响输出文件的选项，不参与设置摘要
+# 间隔单独按帧数记录，以便识别新间隔是否为旧间隔的约数
+RUNTIME_OPTIONS = {'output_folder', 'encoder_threads', 'thumbnail_size', 'sparse_mode', 'resume', 'reuse_step',
+                   'interval'}
+
+
+def video_fingerprint(video_path):
+    """文件大小加开头、中间、结尾各 1 MB 的摘要，不必读完整个文件就能识别内容是否变化"""
+    size = os.path.getsize(video_path)
+    digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with open(video_path, 'rb') as f:
+        for offset in (0, max(0, size // 2 - FINGERPRINT_CHUNK // 2), max(0, size - FINGERPRINT_CHUNK)):
+            f.seek(offset)
+            digest.update(f.read(FINGERPRINT_CHUNK))
+    return f"{size}-{digest.hexdigest()}"
+
+
+def settings_digest(options):
+    """影响输出文件的提取选项的摘要，设置改变后旧的断点不再可用"""
+    relevant = {key: value for key, value in options.items() if key not in RUNTIME_OPTIONS}
+    return hashlib.blake2b(json.dumps(relevant, sort_keys=True).encode(), digest_size=16).hexdigest()
+
+
+def renumber_frames(video_path, options, files, old_step, new_step):
+    """采样间隔缩短为旧间隔的约数时，把旧文件改名为新间隔下的编号，返回改名后的文件名列表
+
+    旧编号 n 对应帧 n * old_step，在新间隔下编号为 n * old_step // new_step。
+    新编号不小于旧编号，从大到小改名不会覆盖还没改名的文件。
+    """
+    folder = output_folder_for(video_path, options)
+    prefix = os.path.splitext(os.path.basename(video_path))[0] + '_frame_'
+    extension = encoder_settings(options)[0]
+    numbers = [
+        int(name[len(prefix):-len(extension)]) for name in files
+        if name.startswith(prefix) and name.endswith(extension) and name[len(prefix):-len(extension)].isdigit()
+    ]
+    renamed = []
+    for number in sorted(numbers, reverse=True):
+        new_name = f"{prefix}{number * old_step // new_step:04d}{extension}"
+        os.replace(os.path.join(folder, f"{prefix}{number:04d}{extension}"), os.path.join(folder, new_name))
+        renamed.append(new_name)
+    return renamed[::-1]
+
+
+class ExtractionManifest:
+    """输出目录中的断点记录 .fx_manifest.json
+
+    每个视频（按绝对路径）记录指纹、设置摘要、采样间隔帧数、已完成的帧区间
+    {起始帧: 下一帧}（下一帧为 None 表示到视频结尾）、是否全部完成以及已写出的文件名。
+    只在主进程中使用，子进程通过 'checkpoint' 回报进度。
+    """
+
+    def __init__(self, output_folder):
+        self.path = os.path.join(output_folder, MANIFEST_NAME)
+        self.videos = {}
+        self.files = {}  # 视频路径 -> {文件名: None}，保持写出顺序并去重
+        self.saved_at = 0.0
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                self.videos = json.load(f).get('videos', {})
+        except (OSError, ValueError):
+            pass  # 没有记录或记录损坏时从头开始
+        for key, entry in self.videos.items():
+            self.files[key] = dict.fromkeys(entry.get('files', []))
+
+    def fingerprint(self, video_path):
+        """视频指纹；文件大小和修改时间都没变时直接用记录中的值，不再读取文件"""
+        stat = os.stat(video_path)
+        entry = self.videos.get(os.path.abspath(video_path))
+        if entry is not None and entry.get('size') == stat.st_size and entry.get('mtime_ns') == stat.st_mtime_ns:
+            return entry['fingerprint']
+        return video_fingerprint(video_path)
+
+    def find_entry(self, video_path, fingerprint):
+        """按路径查找记录；视频移动过位置（原路径已不存在）时按指纹和文件名找回原来的记录"""
+        key = os.path.abspath(video_path)
+        if key in self.videos:
+            return self.videos[key], self.files[key]
+        name = os.path.basename(key)
+        for other_key, entry in self.videos.items():
+            if (entry.get('fingerprint') == fingerprint and os.path.basename(other_key) == name
+                    and not os.path.exists(other_key)):
+                del self.videos[other_key]
+                return entry, self.files.pop(other_key)
+        return None, {}
+
+    def open_video(self, video_path, fingerprint, settings, interval_frames, reusable=False, reset=False):
+        """返回 (还需要处理的帧区间列表, 可沿用的旧采样间隔帧数)
+
+        视频内容和设置都没变时沿用记录，已完成的视频没有剩余区间。
+        只有采样间隔变为上次（已完成）间隔的约数且 reusable 为真时，旧间隔的采样点仍然有效，
+        返回旧间隔供调用方重新编号旧文件并跳过这些采样点；其余情况清除旧记录。
+        """
+        key = os.path.abspath(video_path)
+        stat = os.stat(video_path)
+        entry, files = self.find_entry(video_path, fingerprint)
+        reuse_step = 0
+        if (not reset and entry is not None
+                and entry.get('fingerprint') == fingerprint and entry.get('settings') == settings):
+            if entry.get('interval_frames') == interval_frames:
+                entry.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+                self.videos[key], self.files[key] = entry, files
+                return self.remaining_ranges(video_path), entry.get('reuse_step', 0)
+            old_step = entry.get('interval_frames') or 0
+            if reusable and entry['complete'] and interval_frames and old_step % interval_frames == 0:
+                reuse_step = old_step
+
+        self.videos[key] = {
+            'fingerprint': fingerprint, 'settings': settings, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+            'interval_frames': interval_frames, 'reuse_step': reuse_step, 'renumbered': not reuse_step,
+            'done': {}, 'complete': False, 'files': [],
+        }
+        self.files[key] = files if reuse_step else {}
+        return self.remaining_ranges(video_path), reuse_step
+
+    def renumber(self, video_path, options):
+        """沿用旧间隔的采样点时，旧文件只在第一次运行时改名一次"""
+        key = os.path.abspath(video_path)
+        entry = self.videos[key]
+        if not entry.get('renumbered', True):
+            self.files[key] = dict.fromkeys(renumber_frames(
+                video_path, options, self.files[key], entry['reuse_step'], entry['interval_frames']
+            ))
+            entry['renumbered'] = True
+            self.save(force=True)
+
+    def remaining_ranges(self, video_path):
+        entry = self.videos[os.path.abspath(video_path)]
+        if entry['complete']:
+            return []
+        remaining = []
+        position = 0
+        for start, end in sorted((int(start), end) for start, end in entry['done'].items()):
+            if start > position:
+                remaining.append((position, start))
+            if end is None:
+                return remaining
+            position = max(position, end)
+        remaining.append((position, None))
+        return remaining
+
+    def record(self, video_path, start_frame, next_frame, files):
+        key = os.path.abspath(video_path)
+        done = self.videos[key]['done']
+        previous = done.get(str(start_frame), start_frame)
+        if previous is not None and next_frame > previous:
+            done[str(start_frame)] = next_frame
+        self.files[key].update(dict.fromkeys(files))
+
+    def finish_task(self, video_path, start_frame, end_frame):
+        entry = self.videos[os.path.abspath(video_path)]
+        entry['done'][str(start_frame)] = end_frame
+        entry['complete'] = not self.remaining_ranges(video_path)
+
+    def save(self, force=False):
+        """原子地写回记录；未到保存间隔时跳过，结束时用 force 保证写入"""
+        now = time.perf_counter()
+        if not force and now - self.saved_at < MANIFEST_SAVE_INTERVAL:
+            return
+        self.saved_at = now
+        for key, entry in self.videos.items():
+            entry['files'] = list(self.files.get(key, ()))
+        temp_path = self.path + '.part'
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': 1, 'videos': self.videos}, f, ensure_ascii=False)
+            os.replace(temp_path, self.path)
+        except OSError:
+            pass  # 断点只是优化，写不进去时不影响提取
+
+
+# 每个视频输出目录中的帧索引 <视频名>.frames.csv，每张写出的帧一行
+FRAME_INDEX_SUFFIX = '.frames.csv'
+FRAME_INDEX_FIELDS = ('frame_index', 'pts_ms', 'file', 'bytes', 'sharpness', 'brightness', 'dhash')
+# 帧索引最多每隔这么多秒写一次盘
+FRAME_INDEX_SAVE_INTERVAL = 2.0
+
+
+def frame_index_path(video_path, options):
+    video_name = os.path.splitext(os.path.basename(video_path))[0]
+    return os.path.join(output_folder_for(video_path, options), video_name + FRAME_INDEX_SUFFIX)
+
+
+def frame_index_row(frame_index, fps, file_name, quality=None, frame_hash=None):
+    """一帧的索引行；时间戳按帧序号和标称帧率计算，与定位时使用的帧序号一致。
+    清晰度、亮度和 dHash 只在提取时已经算过的情况下填写，字节数由编码线程补上"""
+    sharpness, brightness = quality or (None, None)
+    return {
+        'frame_index': frame_index,
+        'pts_ms': round(frame_index * 1000.0 / fps, 3),
+        'file': file_name,
+        'bytes': None,
+        'sharpness': None if sharpness is None else round(sharpness, 3),
+        'brightness': None if brightness is None else round(brightness, 3),
+        'dhash': None if frame_hash is None else f"{frame_hash:016x}",
+    }
+
+
+def read_frame_index(path):
+    """读取帧索引，返回按帧序号排列的行字典列表；文件不存在或损坏时返回空列表"""
+    rows = []
+    try:
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                rows.append({
+                    'frame_index': int(row['frame_index']),
+                    'pts_ms': float(row['pts_ms']),
+                    'file': row['file'],
+                    'bytes': int(row['bytes']) if row['bytes'] else None,
+                    'sharpness': float(row['sharpness']) if row['sharpness'] else None,
+                    'brightness': float(row['brightness']) if row['brightness'] else None,
+                    'dhash': row['dhash'] or None,
+                })
+    except (OSError, KeyError, ValueError, csv.Error):
+        return []
+    return rows
+
+
+class FrameIndex:
+    """单个视频的帧索引，下游工具和预览页不必打开图片就能查询和排序
+
+    按文件名去重，重新写出的帧覆盖旧行。只在主进程中使用，子进程通过 'record' 回报。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = {row['file']: row for row in read_frame_index(path)}
+        self.dirty = False
+        self.saved_at = 0.0
+
+    def keep(self, files):
+        """只保留断点记录中仍然有效的文件，重新提取或换了设置时丢弃旧行"""
+        count = len(self.rows)
+        self.rows = {name: row for name, row in self.rows.items() if name in files}
+        self.dirty = self.dirty or len(self.rows) != count
+
+    def renumber(self, video_path, interval_frames):
+        """旧文件按新间隔改名后（见 renumber_frames），按帧序号算出新文件名"""
+        prefix = os.path.splitext(os.path.basename(video_path))[0] + '_frame_'
+        rows = {}
+        for name, row in self.rows.items():
+            if name.startswith(prefix):
+                extension = os.path.splitext(name)[1]
+                name = row['file'] = f"{prefix}{row['frame_index'] // interval_frames:04d}{extension}"
+            rows[name] = row
+        self.rows = rows
+        self.dirty = True
+
+    def add(self, row):
+        self.rows[row['file']] = row
+        self.dirty = True
+
+    def save(self, force=False):
+        """原子地写回索引；没有变化或未到保存间隔时跳过"""
+        now = time.perf_counter()
+        if not self.dirty or (not force and now - self.saved_at < FRAME_INDEX_SAVE_INTERVAL):
+            return
+        self.saved_at = now
+        temp_path = self.path + '.part'
+        try:
+            with open(temp_path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, FRAME_INDEX_FIELDS)
+                writer.writeheader()
+                writer.writerows(sorted(self.rows.values(), key=lambda row: row['frame_index']))
+            os.replace(temp_path, self.path)
+            self.dirty = False
+        except OSError:
+            pass  # 索引只是附加信息，写不进去时不影响提取
+
+
+class ProgressTracker:
+    """汇总整批任务的进度
+
+    按 probe_videos 得到的帧数计算总体和单个文件的完成比例，并统计解码速度、
+    写入速度和预计剩余时间。帧数元数据偏小时以实际解码到的位置为准。
+    """
+
+    def __init__(self, probes, tasks, resumed=None):
+        self.lock = threading.Lock()
+        self.video_totals = {video_path: frames for video_path, (frames, fps) in probes.items()}
+        self.frames_total = sum(self.video_totals.values())
+        # 上次运行已完成的帧计入进度，但不计入解码速度
+        self.resumed = collections.Counter(resumed or {})
+        self.frames_resumed = sum(self.resumed.values())
+        self.task_lengths = {
+            (video_path, start_frame): (end_frame if end_frame is not None
+                                        else max(self.video_totals.get(video_path, 0), start_frame)) - start_frame
+            for video_path, start_frame, end_frame in tasks
+        }
+        self.tasks_per_video = collections.Counter(video_path for video_path, _, _ in tasks)
+        self.finished_tasks = collections.Counter()
+        self.task_done = {}
+        self.video_done = collections.Counter()
+        self.frames_done = 0
+        self.frames_written = 0
+        self.bytes_written = 0
+        self.frames_skipped = collections.Counter()  # 按原因统计被过滤的帧
+        self.started = time.perf_counter()
+
+    def advance(self, video_path, start_frame, done):
+        key = (video_path, start_frame)
+        previous = self.task_done.get(key, 0)
+        if done > previous:
+            self.task_done[key] = done
+            self.video_done[video_path] += done - previous
+            self.frames_done += done - previous
+
+    def update(self, video_path, start_frame, frame_index):
+        with self.lock:
+            self.advance(video_path, start_frame, frame_index + 1 - start_frame)
+
+    def finish_task(self, video_path, start_frame):
+        with self.lock:
+            self.advance(video_path, start_frame, self.task_lengths.get((video_path, start_frame), 0))
+            self.finished_tasks[video_path] += 1
+
+    def add_written(self, byte_count):
+        with self.lock:
+            self.frames_written += 1
+            self.bytes_written += byte_count
+
+    def add_skipped(self, reason):
+        with self.lock:
+            self.frames_skipped[reason] += 1
+
+    def snapshot(self, video_path=None):
+        """返回可直接序列化为 JSON 的进度字典，video_path 指定要报告的当前文件"""
+        with self.lock:
+            elapsed = max(time.perf_counter() - self.started, 1e-6)
+            frames_done = self.frames_done + self.frames_resumed
+            frames_total = max(self.frames_total, frames_done)
+            decode_fps = self.frames_done / elapsed
+            remaining = frames_total - frames_done
+            stats = {
+                'frames_done': frames_done,
+                'frames_total': frames_total,
+                'percent': 100.0 * frames_done / frames_total if frames_total else 0.0,
+                'videos_finished': sum(
+                    1 for path in self.video_totals if self.finished_tasks[path] >= self.tasks_per_video[path]
+                ),
+                'videos_total': len(self.video_totals),
+                'frames_written': self.frames_written,
+                'frames_skipped': dict(self.frames_skipped),
+                'decode_fps': decode_fps,
+                'write_mbps': self.bytes_written / elapsed / (1024 * 1024),
+                'elapsed': elapsed,
+                'eta': remaining / decode_fps if decode_fps > 0 else None,
+            }
+            if video_path is not None:
+                video_done = self.video_done[video_path] + self.resumed[video_path]
+                stats.update(
+                    video=video_path,
+                    video_done=video_done,
+                    video_total=max(self.video_totals.get(video_path, 0), video_done),
+                )
+            return stats
+
+
+def run_extraction(video_paths, options, report, workers=1, control=None):
+    """提取一批视频，阻塞直到完成或停止
+
+    workers 大于 1 时使用进程池，否则在当前线程顺序处理。场景模式下视频不拆分，
+    进程池只在视频之间并行。去重时始终顺序处理，见下。
+    control 为 ExtractionControl，用于暂停、继续和停止；前端不直接调用本函数，而是通过 ExtractionEngine。
+    开始前先读取所有视频的帧数，之后每个采样帧回报一次 'progress'，
+    内容为 ProgressTracker.snapshot() 的字典。
+    进度同时记录在输出目录的断点记录中，options['resume'] 为真时跳过上次已完成的视频，
+    未完成的视频从断点继续。每个视频写出的帧另记在输出目录的帧索引 <视频名>.frames.csv 中。
+    """
+    control = control or ExtractionControl()
+    if options['dedup']:
+        # 哪些帧算重复取决于比较的先后，进程池中各段的完成顺序不固定；
+        # 顺序处理时整批视频共用一个去重索引，结果可重复
+        workers = 1
+
+    probes = probe_videos(video_paths)
+    manifest = ExtractionManifest(options['output_folder'])
+    settings = settings_digest(options)
+    # 只有固定间隔采样的结果与间隔无关地可复用；去重的结果依赖之前保存过哪些帧，不能复用
+    reusable = options['sampling_mode'] == SAMPLING_MODE_INTERVAL and not options['dedup']
+    ranges = {}
+    video_options = {}  # 需要跳过已有采样点的视频单独一份选项
+    for video_path in video_paths:
+        total_frames, fps = probes[video_path]
+        # 场景模式与采样间隔无关
+        interval_frames = (interval_to_frames(fps, options['interval'])
+                           if fps > 0 and options['sampling_mode'] != SAMPLING_MODE_SCENE else 0)
+        try:
+            fingerprint = manifest.fingerprint(video_path)
+            ranges[video_path], reuse_step = manifest.open_video(
+                video_path, fingerprint, settings, interval_frames, reusable, reset=not options['resume']
+            )
+            if reuse_step:
+                manifest.renumber(video_path, options)
+                video_options[video_path] = dict(options, reuse_step=reuse_step)
+        except OSError as e:
+            if video_path in ranges:
+                report('error', f"Could not reuse frames of {video_path}: {str(e)}")
+                ranges[video_path], _ = manifest.open_video(video_path, fingerprint, settings, interval_frames,
+                                                            reset=True)
+            continue  # 读不了的文件交给 extract_video 报告错误
+
+    frame_indexes = {}
+    for video_path in ranges:
+        key = os.path.abspath(video_path)
+        frame_index = frame_indexes[video_path] = FrameIndex(frame_index_path(video_path, options))
+        if video_path in video_options:
+            # 沿用的旧文件已经按新间隔改名，索引中的文件名随之更新
+            frame_index.renumber(video_path, manifest.videos[key]['interval_frames'])
+        frame_index.keep(manifest.files[key])
+
+    if workers > 1 and options['sampling_mode'] != SAMPLING_MODE_SCENE:
+        tasks = plan_extraction_tasks(video_paths, options['interval'], workers, probes, ranges)
+    else:
+        tasks = [
+            (video_path, start_frame, end_frame)
+            for video_path in video_paths
+            for start_frame, end_frame in ranges.get(video_path, [(0, None)])
+        ]
+    task_ends = {(video_path, start_frame): end_frame for video_path, start_frame, end_frame in tasks}
+    resumed = {
+        video_path: max(0, probes[video_path][0] - sum(
+            range_length(start, end, max(probes[video_path][0], start)) for start, end in video_ranges
+        ))
+        for video_path, video_ranges in ranges.items()
+    }
+    tracker = ProgressTracker(probes, tasks, resumed)
+    incomplete = set()  # 有帧写入失败的任务，不标记为完成
+
+    def track(kind, payload):
+        if kind == 'position':
+            tracker.update(*payload)
+            report('progress', tracker.snapshot(payload[0]))
+        elif kind == 'written':
+            tracker.add_written(payload)
+        elif kind == 'skipped':
+            tracker.add_skipped(payload)
+        elif kind == 'record':
+            video_path, row = payload
+            if video_path not in frame_indexes:
+                frame_indexes[video_path] = FrameIndex(frame_index_path(video_path, options))
+            frame_indexes[video_path].add(row)
+        elif kind == 'checkpoint':
+            if payload[0] in ranges:
+                manifest.record(*payload)
+                manifest.save()
+            if payload[0] in frame_indexes:
+                frame_indexes[payload[0]].save()
+        elif kind == 'incomplete':
+            incomplete.add(payload)
+        elif kind == 'task_done':
+            video_path, start_frame = payload
+            tracker.finish_task(video_path, start_frame)
+            if video_path in ranges and payload not in incomplete:
+                manifest.finish_task(video_path, start_frame, task_ends[payload])
+                manifest.save()
+            report('progress', tracker.snapshot(video_path))
+        else:
+            report(kind, payload)
+
+    try:
+        if workers > 1 and tasks:
+            _run_in_process_pool(tasks, options, track, workers, control, video_options)
+        else:
+            _run_sequential(tasks, options, track, control, video_options,
+                            seeded_duplicate_filter(options, frame_indexes.values()))
+    finally:
+        manifest.save(force=True)
+        for frame_index in frame_indexes.values():
+            frame_index.save(force=True)
+
+
+def seeded_duplicate_filter(options, frame_indexes):
+    """整批视频共用的去重索引，预先登记帧索引中已保存帧的哈希
+
+    续传的视频和跳过的已完成视频都要参与比较，结果才与一次提取完相同。
+    """
+    duplicate_filter = make_duplicate_filter(options)
+    if duplicate_filter is not None:
+        for frame_index in frame_indexes:
+            for row in frame_index.rows.values():
+                if row['dhash']:
+                    duplicate_filter.add(int(row['dhash'], 16))
+    return duplicate_filter
+
+
+def _run_sequential(tasks, options, report, control, video_options=None, duplicate_filter=None):
+    """duplicate_filter 为整批视频共用的去重索引（见 seeded_duplicate_filter）"""
+    for video_path, start_frame, end_frame in tasks:
+        if control.is_stopped():  # 检查停止标志
+            break
+        try:
+            extract_video(video_path, (video_options or {}).get(video_path, options), report,
+                          should_stop=control.is_stopped,
+                          wait_if_paused=control.wait_if_paused,
+                          start_frame=start_frame, end_frame=end_frame,
+                          duplicate_filter=duplicate_filter)
+        except Exception as e:
+            report('error', f"Error processing video {video_path}: {str(e)}")
+        if not control.is_stopped():
+            report('task_done', (video_path, start_frame))
+
+
+def _run_in_process_pool(tasks, options, report, workers, control, video_options=None):
+    """把任务（长视频已按分段拆开）分发到进程池，并把子进程的消息汇总给 report
+
+    子进程直接等待 control 中的事件，暂停和停止不经过主进程转发。停止后取消还没开始的任务，
+    继续接收正在运行的任务的消息，直到它们发送 done，最后的断点也不会丢失。
+    """
+    # GUI 中 Qt 已经启动了线程，fork 不安全，统一使用 spawn
+    context = multiprocessing.get_context('spawn')
+    messages = context.Queue()
+
+    pool = concurrent.futures.ProcessPoolExecutor(
+        max_workers=min(workers, len(tasks)),
+        mp_context=context,
+        initializer=_init_extraction_worker,
+        initargs=(messages, control)
+    )
+    futures = {}
+    pending = set()
+    try:
+        futures = {
+            pool.submit(_extract_video_task, task_id, video_path, (video_options or {}).get(video_path, options),
+                        start_frame, end_frame): task_id
+            for task_id, (video_path, start_frame, end_frame) in enumerate(tasks)
+        }
+        pending.update(futures.values())
+        cancelled = False
+        while pending:
+            if control.is_stopped() and not cancelled:
+                cancelled = True
+                _cancel_queued_tasks(futures, pending)
+
+            try:
+                # 超时只用于发现崩溃的子进程和停止后取消排队的任务
+                task_id, kind, payload = messages.get(timeout=0.1)
+            except queue.Empty:
+                # 子进程崩溃时不会发送 done，从 future 上取异常
+                for future, task_id in futures.items():
+                    if task_id in pending and future.done() and future.exception() is not None:
+                        pending.discard(task_id)
+                        report('error', f"Worker process failed: {future.exception()}")
+                continue
+
+            if kind == 'done':
+                pending.discard(task_id)
+                if not control.is_stopped():
+                    video_path, start_frame, _ = tasks[task_id]
+                    report('task_done', (video_path, start_frame))
+            else:
+                report(kind, payload)
+    finally:
+        if pending:
+            # 异常退出（如 Ctrl+C）：通知子进程停止，并收下正在运行的任务最后的断点和帧索引
+            control.stop()
+            _cancel_queued_tasks(futures, pending)
+            while pending:
+                try:
+                    task_id, kind, payload = messages.get(timeout=1.0)
+                except queue.Empty:
+                    break
+                if kind == 'done':
+                    pending.discard(task_id)
+                elif kind in ('checkpoint', 'record'):
+                    report(kind, payload)
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _cancel_queued_tasks(futures, pending):
+    for future, task_id in futures.items():
+        if future.cancel():
+            pending.discard(task_id)
+
+
+_JOB_FINISHED = ('finished', None)
+
+
+class ExtractionEngine:
+    """提取引擎，图形界面和命令行共用的唯一入口
+
+    submit() 在后台线程中运行 run_extraction，回报按顺序放进队列，
+    调用方在自己的线程里用 results() 迭代 (kind, payload)，任务结束后迭代随之结束。
+    cancel()、pause() 和 resume() 可以在任意线程调用；不在任务运行期间调用时（包括两个任务之间）
+    作用于下一个提交的任务。同一时间只运行一个任务，结束后可以再次提交::
+
+        engine = ExtractionEngine(workers=4)
+        engine.submit(video_paths, options)
+        for kind, payload in engine.results():
+            ...
+    """
+
+    def __init__(self, workers=1):
+        self.workers = max(1, workers)
+        self.control = ExtractionControl()
+        self.events = queue.Queue()
+        self.thread = None
+
+    def submit(self, video_paths, options):
+        if self.is_running():
+            raise RuntimeError("an extraction job is already running")
+        self.events = queue.Queue()
+        self.thread = threading.Thread(
+            target=self._run, args=(list(video_paths), dict(options), self.control, self.events), daemon=True
+        )
+        self.thread.start()
+
+    def _run(self, video_paths, options, control, events):
+        try:
+            if control.is_stopped():
+                return  # 提交前已经取消，不读取视频也不写断点记录
+            run_extraction(video_paths, options, lambda kind, payload: events.put((kind, payload)),
+                           workers=self.workers, control=control)
+        except Exception as e:
+            events.put(('error', f"Extraction failed: {str(e)}"))
+        finally:
+            # 结束标记之前换上新的控制对象，之后的 cancel()、pause() 留给下一个任务
+            self.control = ExtractionControl()
+            events.put(_JOB_FINISHED)
+
+    def results(self):
+        """按顺序产生当前任务的回报，直到任务结束"""
+        if self.thread is None:
+            return
+        events, thread = self.events, self.thread
+        while True:
+            event = events.get()
+            if event is _JOB_FINISHED:
+                events.put(event)  # 留给之后再次调用的 results()
+                thread.join()  # 线程放入结束标记后只剩退出，等它结束后即可再次 submit()
+                return
+            yield event
+
+    def cancel(self):
+        self.control.stop()
+
+    def pause(self):
+        self.control.pause()
+
+    def resume(self):
+        self.control.resume()
+
+    def is_paused(self):
+        return self.control.is_paused()
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def join(self, timeout=None):
+        """等待后台线程退出；取消后调用，确保断点已经写入"""
+        if self.thread is not None:
+            self.thread.join(timeout)
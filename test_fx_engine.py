@@ -0,0 +1,198 @@
+"""fx_engine 中断点续传、分段和去重索引的行为测试，不依赖 Qt"""
+import os
+import random
+
+import numpy as np
+import pytest
+
+from fx_engine import (
+    ExtractionEngine, ExtractionManifest, FrameIndex, MultiIndexHash, cv2, extract_video, hamming_distance, make_options,
+    plan_extraction_tasks, renumber_frames, run_extraction, video_fingerprint
+)
+
+
+def open_manifest(tmp_path, settings='settings', interval_frames=10):
+    video_path = tmp_path / 'a.mp4'
+    if not video_path.exists():
+        video_path.write_bytes(b'video' * 100)
+    output_folder = tmp_path / 'out'
+    output_folder.mkdir(exist_ok=True)
+    manifest = ExtractionManifest(str(output_folder))
+    ranges, _ = manifest.open_video(str(video_path), video_fingerprint(str(video_path)), settings, interval_frames)
+    return manifest, str(video_path), ranges
+
+
+def write_video(path, frames=60, fps=10):
+    """每帧亮度不同的小视频"""
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'MJPG'), fps, (64, 48))
+    for index in range(frames):
+        writer.write(np.full((48, 64, 3), index * 4 % 256, dtype=np.uint8))
+    writer.release()
+
+
+def test_new_video_has_whole_range_remaining(tmp_path):
+    manifest, video_path, ranges = open_manifest(tmp_path)
+    assert ranges == [(0, None)]
+    assert manifest.remaining_ranges(video_path) == [(0, None)]
+
+
+def test_record_merges_checkpoints_without_going_back(tmp_path):
+    manifest, video_path, _ = open_manifest(tmp_path)
+    manifest.record(video_path, 0, 30, ['a_frame_0000.jpg', 'a_frame_0001.jpg'])
+    manifest.record(video_path, 0, 20, ['a_frame_0001.jpg'])  # 较早的断点不会让进度倒退
+    manifest.record(video_path, 100, 150, ['a_frame_0010.jpg'])
+    assert manifest.remaining_ranges(video_path) == [(30, 100), (150, None)]
+    assert list(manifest.files[os.path.abspath(video_path)]) == [
+        'a_frame_0000.jpg', 'a_frame_0001.jpg', 'a_frame_0010.jpg'
+    ]
+
+
+def test_finished_tasks_complete_the_video(tmp_path):
+    manifest, video_path, _ = open_manifest(tmp_path)
+    manifest.record(video_path, 0, 30, [])
+    manifest.finish_task(video_path, 100, None)
+    assert manifest.remaining_ranges(video_path) == [(30, 100)]
+    assert not manifest.videos[os.path.abspath(video_path)]['complete']
+    manifest.finish_task(video_path, 0, 100)
+    assert manifest.remaining_ranges(video_path) == []
+    assert manifest.videos[os.path.abspath(video_path)]['complete']
+
+
+def test_saved_manifest_resumes_only_with_same_settings(tmp_path):
+    manifest, video_path, _ = open_manifest(tmp_path)
+    manifest.record(video_path, 0, 40, ['a_frame_0000.jpg'])
+    manifest.save(force=True)
+
+    _, _, ranges = open_manifest(tmp_path)
+    assert ranges == [(40, None)]
+    _, _, ranges = open_manifest(tmp_path, settings='other')
+    assert ranges == [(0, None)]
+
+
+def assert_contiguous(tasks, range_start, range_end):
+    tasks = sorted(tasks, key=lambda task: task[1])
+    assert tasks[0][1] == range_start
+    for (_, _, end), (_, start, _) in zip(tasks, tasks[1:]):
+        assert end == start
+    assert tasks[-1][2] == range_end
+
+
+def test_segments_cover_the_video_on_sampling_points():
+    probes = {'v': (10000, 30.0)}
+    tasks = plan_extraction_tasks(['v'], 1.0, 4, probes)
+    assert len(tasks) > 1
+    assert_contiguous(tasks, 0, None)
+    assert all(start % 30 == 0 for _, start, _ in tasks)
+
+
+def test_resumed_segments_stay_aligned_to_sampling_windows():
+    """续传区间从窗口中间开始时，只有第一段从断点开始，其余边界仍在采样点上"""
+    probes = {'v': (10000, 30.0)}
+    tasks = plan_extraction_tasks(['v'], 1.0, 4, probes, {'v': [(1234, 9000)]})
+    assert len(tasks) > 1
+    assert_contiguous(tasks, 1234, 9000)
+    assert all(start % 30 == 0 for _, start, _ in tasks if start != 1234)
+
+
+def test_failed_write_caps_checkpoint_and_leaves_task_incomplete(tmp_path):
+    video_path = tmp_path / 'a.avi'
+    write_video(video_path)
+    output_folder = tmp_path / 'out'
+    output_folder.mkdir()
+    (output_folder / 'a_frame_0003.jpg').mkdir()  # 第 4 张帧（第 30 帧）无法写入
+    options = make_options(output_folder=str(output_folder), interval=1.0)
+
+    reports = []
+    extract_video(str(video_path), options, lambda kind, payload: reports.append((kind, payload)))
+    checkpoints = [payload for kind, payload in reports if kind == 'checkpoint']
+    assert checkpoints[-1][2] == 30
+    assert ('incomplete', (str(video_path), 0)) in reports
+
+    run_extraction([str(video_path)], options, lambda kind, payload: None)
+    manifest = ExtractionManifest(str(output_folder))
+    entry = manifest.videos[os.path.abspath(video_path)]
+    assert not entry['complete']
+    assert manifest.remaining_ranges(str(video_path)) == [(30, None)]
+
+    (output_folder / 'a_frame_0003.jpg').rmdir()
+    run_extraction([str(video_path)], options, lambda kind, payload: None)
+    manifest = ExtractionManifest(str(output_folder))
+    assert manifest.videos[os.path.abspath(video_path)]['complete']
+    assert sorted(name for name in os.listdir(output_folder) if name.endswith('.jpg')) == [
+        f'a_frame_{number:04d}.jpg' for number in range(6)
+    ]
+
+
+@pytest.mark.parametrize('old_step, new_step', [(4, 2), (6, 3), (6, 2), (10, 1)])
+def test_renumber_frames_moves_each_file_to_its_new_number(tmp_path, old_step, new_step):
+    """新编号会与还没改名的旧文件重名，必须从大到小改名才不会覆盖"""
+    options = make_options(output_folder=str(tmp_path), interval=1.0)
+    numbers = [0, 1, 2, 3, 5, 8]
+    files = [f'a_frame_{number:04d}.jpg' for number in numbers]
+    for number, name in zip(numbers, files):
+        (tmp_path / name).write_text(str(number))
+
+    renamed = renumber_frames(str(tmp_path / 'a.mp4'), options, files, old_step, new_step)
+    expected = [f'a_frame_{number * old_step // new_step:04d}.jpg' for number in numbers]
+    assert renamed == expected
+    assert sorted(os.listdir(tmp_path)) == sorted(expected)
+    for number, name in zip(numbers, expected):
+        assert (tmp_path / name).read_text() == str(number)
+
+
+def test_frame_index_follows_renumbered_files(tmp_path):
+    frame_index = FrameIndex(str(tmp_path / 'a.frames.csv'))
+    for number in range(3):
+        frame_index.add({'frame_index': number * 40, 'pts_ms': number * 4000.0, 'file': f'a_frame_{number:04d}.jpg',
+                         'bytes': 1, 'sharpness': None, 'brightness': None, 'dhash': None})
+    frame_index.renumber(str(tmp_path / 'a.mp4'), 20)
+    assert sorted(frame_index.rows) == ['a_frame_0000.jpg', 'a_frame_0002.jpg', 'a_frame_0004.jpg']
+    assert frame_index.rows['a_frame_0004.jpg']['frame_index'] == 80
+
+
+@pytest.mark.parametrize('threshold', [0, 3, 4, 6, 10, 12])
+def test_multi_index_hash_matches_brute_force(threshold):
+    rng = random.Random(threshold)
+    stored = [rng.getrandbits(64) for _ in range(2000)]
+    index = MultiIndexHash()
+    for value in stored:
+        index.add(value)
+    queries = [rng.getrandbits(64) for _ in range(200)]
+    # 再加上与已存哈希只差几位的查询，覆盖阈值附近的情况
+    for value in rng.sample(stored, 300):
+        for bit in rng.sample(range(64), rng.randint(0, threshold + 2)):
+            value ^= 1 << bit
+        queries.append(value)
+    for value in queries:
+        expected = any(hamming_distance(value, other) <= threshold for other in stored)
+        assert index.contains_within(value, threshold) == expected
+
+
+def count_frames(engine):
+    return sum(1 for kind, _ in engine.results() if kind == 'frame')
+
+
+def test_engine_cancel_before_submit_writes_nothing(tmp_path):
+    video_path = tmp_path / 'a.avi'
+    write_video(video_path)
+    output_folder = tmp_path / 'out'
+    output_folder.mkdir()
+    engine = ExtractionEngine()
+    engine.cancel()
+    engine.submit([str(video_path)], make_options(output_folder=str(output_folder), interval=1.0))
+    assert count_frames(engine) == 0
+    assert os.listdir(output_folder) == []
+
+
+def test_engine_cancel_between_jobs_applies_to_next_job(tmp_path):
+    video_path = tmp_path / 'a.avi'
+    write_video(video_path)
+    engine = ExtractionEngine()
+    engine.submit([str(video_path)], make_options(output_folder=str(tmp_path / 'first'), interval=1.0))
+    assert count_frames(engine) == 6
+    engine.cancel()
+    engine.submit([str(video_path)], make_options(output_folder=str(tmp_path / 'second'), interval=1.0))
+    assert count_frames(engine) == 0
+    # 被取消的任务结束后，控制对象重置，再次提交正常运行
+    engine.submit([str(video_path)], make_options(output_folder=str(tmp_path / 'third'), interval=1.0))
+    assert count_frames(engine) == 6